@@ -1,38 +1,64 @@
-import time
-from pyfpgrowth import *
+import sys
+import pandas
 from pandas import *
+from minageItemsets import itemsets_frequents, regles_association, filtre_motifs
+from minageIncremental import MineurIncremental, charge_mineur
+from reglesAssociation import mesures_regles, meilleures_regles
+from stockage import ecrire_table, lire_table
+from metriques import Metriques
+
+# Le mode "compatible" reproduit pyfpgrowth, qui oublie des itemsets selon l'ordre de
+# l'arbre ; le mode incrémental ne peut donner que les résultats exacts. Les deux
+# exécutions utilisent donc le mode exact, pour que --incremental donne les mêmes
+# résultats qu'une exécution complète.
+MODE = "exact"
+SEUIL = 100
+
+
+# Les itemsets dans un ordre fixe (du plus fréquent au moins fréquent) : les tables
+# écrites et les règles (une par antécédent) ne dépendent pas de l'ordre de la recherche
+def ordonne(motifs):
+    return dict(sorted(motifs.items(), key=lambda motif: (-motif[1], motif[0])))
 
-# Récupérer les thématiques associées à un mail
-def retrieve_thematiques(stringToChange):
-    wordsAssociated = stringToChange
-    wordsAssociated = wordsAssociated.replace("[", "")
-    wordsAssociated = wordsAssociated.replace("]", "")
-    wordsAssociated = wordsAssociated.replace(",", "")
-    wordsAssociated = wordsAssociated.replace("'", "")
-    wordsAssociated = wordsAssociated.split(" ")
-    return wordsAssociated
 
 if __name__ == '__main__':
-    df1 = pandas.read_csv("visualisation/data/mails_thematiques.csv", low_memory=False, header=0)
-    itemsets = []
-    # Pour chaque mail, on récupère ses thématiques
-    for mailTraite in df1['Thematiques']:
-        thematiques = retrieve_thematiques(mailTraite)
-        # On met toutes les thématiques dans un tableau
-        itemsets.append(thematiques)
-    # On récupère le fp-tree
-    start_time = time.time()
-    patterns = pyfpgrowth.find_frequent_patterns(itemsets, 100)
-    stop_time = time.time()
-    print("\nTemps de calcul = %f secondes pour les itemsets fréquents" % (stop_time - start_time))
+    metriques = Metriques("FP-growth")
+    # python FP-growth.py --incremental [tables des nouveaux mails] : l'arbre des mails
+    # déjà vus est repris du disque et seuls les nouveaux mails sont lus
+    if "--incremental" in sys.argv:
+        tables = [table for table in sys.argv[1:] if table != "--incremental"]
+        mineur = charge_mineur()
+        if mineur is None:
+            mineur = MineurIncremental()
+        # Sans table donnée : tous les mails étiquetés (les mails déjà vus sont ignorés)
+        if not tables:
+            tables = ["mails_thematiques"]
+        for table in tables:
+            # Les mails sont reconnus par leur Message-ID (idEmail recommence à 0 à chaque export)
+            df1 = lire_table(table, ["Message-ID", "Thematiques"])
+            with metriques.etape("insertion de %s" % table, len(df1)):
+                nbAjoutes = mineur.ajoute(df1['Thematiques'].tolist(), df1['Message-ID'].tolist())
+            if nbAjoutes < len(df1):
+                print("%s : %d mails déjà insérés ont été ignorés" % (table, len(df1) - nbAjoutes))
+        mineur.sauvegarde()
+        nbTransactions = mineur.nbTransactions
+        with metriques.etape("itemsets fréquents", nbTransactions):
+            patterns = ordonne(mineur.motifs(SEUIL))
+    else:
+        df1 = lire_table("mails_thematiques", ["Thematiques"])
+        # Pour chaque mail, on récupère ses thématiques
+        itemsets = df1['Thematiques'].tolist()
+        nbTransactions = len(itemsets)
+        # On récupère le fp-tree
+        with metriques.etape("itemsets fréquents", len(itemsets)):
+            patterns = ordonne(itemsets_frequents(itemsets, SEUIL, MODE))
 
     # Et les règles d'association
-    start_time = time.time()
-    rules = pyfpgrowth.generate_association_rules(patterns, 0.8)
-    stop_time = time.time()
-    print("\nTemps de calcul = %f secondes pour les règles d'association" % (stop_time - start_time))
+    with metriques.etape("règles d'association", len(patterns)):
+        rules = regles_association(patterns, 0.8)
 
-    # On retire les patterns seuls
+    # On retire les patterns seuls (on les garde à part pour les mesures des règles)
+    allPatterns = dict(patterns)
     patternToPop = []
     for pattern in patterns:
         if(len(pattern) == 1):
@@ -43,75 +69,24 @@ if __name__ == '__main__':
     print(patterns)
     print(rules)
 
+    # On enlève les sous-ensembles négligeables : ceux dont tous les sur-ensembles
+    # ont le même count ou un count proche (50%)
+    with metriques.etape("filtrage des sous-ensembles", len(patterns)):
+        filteredPatterns = filtre_motifs(patterns, "ratio", 0.5)
+
     # Nous allons mieux ranger les données
     patterns_df = pandas.DataFrame(columns=['pattern','count'])
-
-    pattern_df = []
-    count_df = []
-
-    # On récupère les différents patterns et count
-    for pattern in patterns:
-        pattern_df.append(pattern)
-        count_df.append(patterns.get(pattern))
-
-    # On les ajoute dans le tableau
-    patterns_df['pattern'] = pattern_df
-    patterns_df['count'] = count_df
-
-    # Les itemsets qu'on va enlever
-    unwanted_patterns = []
-    # Pour chaque pattern
-    iter1 = 0
-    while iter1 < len(patterns_df):
-        # On compte combien sont sous-ensembles des autres
-        countSubsets = 0
-        # Et combien parmi eux ont le même count
-        countSameCount = 0
-        iter2 = 0
-        # On regarde pour chaque pattern
-        while iter2 < len(patterns_df):
-            # Pas le même pattern, et premier est sous-ensemble du deuxième
-            if len(patterns_df['pattern'][iter1]) != len(patterns_df['pattern'][iter2]) and \
-                    set(patterns_df['pattern'][iter1]).issubset(patterns_df['pattern'][iter2]):
-                countSubsets += 1
-                # On regarde s'ils ont le même count (=> petit ensemble non utile)
-                # Ou si le rapport des count est proche (50%)
-                if patterns_df['count'][iter1] == patterns_df['count'][iter2] or\
-                    patterns_df['count'][iter2]/patterns_df['count'][iter1] >= 0.5:
-                        countSameCount += 1
-            iter2 += 1
-        if countSameCount == countSubsets and countSubsets != 0:
-            # Notre petit sous-ensemble est négligeable
-            unwanted_patterns.append(iter1)
-        iter1 += 1
-    # On enlève les patterns inutiles
-    patterns_df = patterns_df.drop(unwanted_patterns)
+    patterns_df['pattern'] = [list(pattern) for pattern in filteredPatterns]
+    patterns_df['count'] = list(filteredPatterns.values())
     patterns_df = patterns_df.rename(columns={"pattern": "Thématiques souvent associées", "count": "Nombre d\'occurences"})
     print(patterns_df)
-    patterns_df.to_csv("visualisation/data/itemsetsFrequents.csv")
-
-    # Nous allons calculer le lift de ces règles
-    rules_df = pandas.DataFrame(columns=['A','B','confiance','support','lift'])
-
-    # Règle : pattern A --> pattern B
-    A_df = []
-    B_df = []
-    conf_df = []
-    support_df = []
-
-    # On récupère les différentes associations
-    for pattern in rules:
-        A_df.append(pattern)
-        B_df.append(rules.get(pattern)[0])
-        conf_df.append(rules.get(pattern)[1])
-        support_df.append(patterns.get(rules.get(pattern)[0]))
+    ecrire_table(patterns_df, "itemsetsFrequents")
 
-    # On les ajoute dans le tableau
-    rules_df['A'] = A_df
-    rules_df['B'] = B_df
-    rules_df['confiance'] = conf_df
-    rules_df['supportB'] = support_df
-    rules_df['lift'] = rules_df["confiance"] / rules_df["support"]
-    rules_df.sort_values(by=['lift'])
+    # Les mesures des règles (support, confiance, lift, levier, conviction), calculées
+    # avec tous les motifs, y compris les patterns seuls
+    with metriques.etape("mesures des règles", len(rules)):
+        rules_df = mesures_regles([(A, B) for A, (B, confiance) in rules.items()], allPatterns, nbTransactions)
+        rules_df = meilleures_regles(rules_df, "lift")
 
-    rules_df.to_csv("visualisation/data/reglesEtCalculs.csv")
\ No newline at end of file
+    ecrire_table(rules_df, "reglesEtCalculs")
+    metriques.ecrit_json()
@@ -0,0 +1,281 @@
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import LinearOperator, svds
+from sklearn.decomposition import IncrementalPCA
+
+## ACP et AFC sur le tableau expéditeurs x thématiques, sans le construire en entier ##
+## Le tableau peut rester creux : le centrage-réduction (comme StandardScaler) n'est   ##
+## jamais calculé, il est appliqué à la volée dans les produits matrice x vecteur.     ##
+## Seules les k premières composantes sont calculées, par ARPACK (svds) ou par SVD     ##
+## randomisée. Les sorties sont celles de PCA(svd_solver='full') de scikit-learn sur  ##
+## les données centrées-réduites : parts d'inertie, coordonnées des individus, et     ##
+## corrélations des variables (cercle des corrélations).                              ##
+
+# "arpack" : les k premières composantes à la précision de la SVD complète
+# "randomise" : plus rapide, les dernières composantes demandées sont approchées
+# "complet" : SVD de tout le tableau centré-réduit (petits tableaux, référence)
+SOLVEURS = ("arpack", "randomise", "complet")
+
+
+# Comme svd_flip de scikit-learn (décision sur les composantes) : le plus grand
+# coefficient de chaque composante est positif
+def oriente(U, Vt):
+    signes = np.sign(Vt[np.arange(Vt.shape[0]), np.argmax(np.abs(Vt), axis=1)])
+    signes[signes == 0] = 1
+    return U * signes, Vt * signes[:, np.newaxis]
+
+
+# Moyennes et variances (divisées par n, comme StandardScaler) des colonnes, creuses ou non
+def moyennes_variances(X):
+    if sparse.issparse(X):
+        moyennes = np.asarray(X.mean(axis=0)).ravel()
+        variances = np.asarray(X.multiply(X).mean(axis=0)).ravel() - moyennes ** 2
+        return moyennes, np.maximum(variances, 0)
+    return X.mean(axis=0), X.var(axis=0)
+
+
+class ACP:
+    def __init__(self, nb_composantes=10, solveur="arpack", iterations=7, surEchantillon=10, graine=0):
+        if solveur not in SOLVEURS:
+            raise ValueError("solveur inconnu : %s" % solveur)
+        self.nb_composantes = nb_composantes
+        self.solveur = solveur
+        self.iterations = iterations
+        self.surEchantillon = surEchantillon
+        self.graine = graine
+
+    # Le tableau centré-réduit Z, sous forme d'opérateur : Z v = X (v / s) - 1 (m / s).v
+    def operateur(self, X):
+        moyennes = self.mean_ / self.scale_
+        echelles = 1 / self.scale_
+
+        def produit(V):
+            V = V.reshape(X.shape[1], -1)
+            return np.asarray(X @ (V * echelles[:, np.newaxis])) - np.outer(np.ones(X.shape[0]), moyennes @ V)
+
+        def produit_transpose(U):
+            U = U.reshape(X.shape[0], -1)
+            return (np.asarray(X.T @ U) - np.outer(self.mean_, U.sum(axis=0))) * echelles[:, np.newaxis]
+
+        return LinearOperator(X.shape, matvec=produit, matmat=produit, rmatvec=produit_transpose,
+                              rmatmat=produit_transpose, dtype=np.float64)
+
+    def fit(self, X):
+        X = sparse.csr_matrix(X, dtype=np.float64) if sparse.issparse(X) else np.asarray(X, dtype=np.float64)
+        n, p = X.shape
+        self.n_samples_ = n
+        self.mean_, variances = moyennes_variances(X)
+        # Une colonne constante n'est pas réduite (comme StandardScaler)
+        self.scale_ = np.sqrt(variances)
+        self.scale_[self.scale_ < 10 * np.finfo(np.float64).eps] = 1
+        Z = self.operateur(X)
+        k = min(self.nb_composantes or min(n, p), min(n, p))
+
+        if self.solveur == "complet" or (self.solveur == "arpack" and k >= min(n, p)):
+            U, S, Vt = np.linalg.svd(Z.matmat(np.eye(p)), full_matrices=False)
+        elif self.solveur == "arpack":
+            v0 = np.random.default_rng(self.graine).standard_normal(min(n, p))
+            U, S, Vt = svds(Z, k=k, v0=v0)
+            ordre = np.argsort(-S)
+            U, S, Vt = U[:, ordre], S[ordre], Vt[ordre]
+        else:
+            U, S, Vt = self.svd_randomisee(Z, k)
+        U, Vt = oriente(U[:, :k], Vt[:k])
+        S = S[:k]
+
+        self.components_ = Vt
+        self.singular_values_ = S
+        self.explained_variance_ = S ** 2 / (n - 1)
+        # Inertie totale : somme des variances des colonnes centrées-réduites
+        inertie = (variances / self.scale_ ** 2).sum() * n / (n - 1)
+        self.explained_variance_ratio_ = self.explained_variance_ / inertie
+        self.coordonnees_ = U * S
+        return self
+
+    # Recherche de l'image de Z avec des vecteurs aléatoires, puis SVD du petit projeté
+    def svd_randomisee(self, Z, k):
+        n, p = Z.shape
+        rng = np.random.default_rng(self.graine)
+        taille = min(k + self.surEchantillon, min(n, p))
+        Q, _ = np.linalg.qr(Z.matmat(rng.standard_normal((p, taille))))
+        for i in range(self.iterations):
+            Q, _ = np.linalg.qr(Z.rmatmat(Q))
+            Q, _ = np.linalg.qr(Z.matmat(Q))
+        B = Z.rmatmat(Q).T
+        Ub, S, Vt = np.linalg.svd(B, full_matrices=False)
+        return Q @ Ub, S, Vt
+
+    def fit_transform(self, X):
+        return self.fit(X).coordonnees_
+
+    # Coordonnées de nouveaux individus, centrés-réduits comme les données de l'ACP
+    def transform(self, X):
+        X = sparse.csr_matrix(X, dtype=np.float64) if sparse.issparse(X) else np.asarray(X, dtype=np.float64)
+        return self.operateur(X).matmat(self.components_.T)
+
+    # Corrélations entre les variables et les composantes (une ligne par variable)
+    def correlations(self):
+        n = self.n_samples_
+        return self.components_.T * np.sqrt((n - 1) / n * self.explained_variance_)
+
+
+# Analyse factorielle des correspondances (AFC) sur un tableau de comptes N (creux ou non).
+# Métrique du khi-deux : SVD des résidus standardisés S = Dr^-1/2 (P - r c') Dc^-1/2,
+# avec P = N / total, r et c les marges. Comme pour l'ACP, S n'est jamais construite.
+class AFC:
+    def __init__(self, nb_axes=10, solveur="arpack", graine=0):
+        if solveur not in ("arpack", "complet"):
+            raise ValueError("solveur inconnu : %s" % solveur)
+        self.nb_axes = nb_axes
+        self.solveur = solveur
+        self.graine = graine
+
+    def fit(self, N):
+        P = sparse.csr_matrix(N, dtype=np.float64)
+        P = P / P.sum()
+        n, p = P.shape
+        r = np.asarray(P.sum(axis=1)).ravel()
+        c = np.asarray(P.sum(axis=0)).ravel()
+        # Une ligne ou une colonne vide ne compte pas dans l'analyse
+        rInv = np.divide(1, np.sqrt(r), out=np.zeros(n), where=r > 0)
+        cInv = np.divide(1, np.sqrt(c), out=np.zeros(p), where=c > 0)
+
+        def produit(V):
+            V = V.reshape(p, -1) * cInv[:, np.newaxis]
+            return (np.asarray(P @ V) - np.outer(r, c @ V)) * rInv[:, np.newaxis]
+
+        def produit_transpose(U):
+            U = U.reshape(n, -1) * rInv[:, np.newaxis]
+            return (np.asarray(P.T @ U) - np.outer(c, r @ U)) * cInv[:, np.newaxis]
+
+        S = LinearOperator((n, p), matvec=produit, matmat=produit, rmatvec=produit_transpose,
+                           rmatmat=produit_transpose, dtype=np.float64)
+        # Au plus min(n, p) - 1 axes (la marge enlève une dimension)
+        k = max(1, min(self.nb_axes, min(n, p) - 1))
+        if self.solveur == "complet" or k >= min(n, p) - 1:
+            U, valeurs, Vt = np.linalg.svd(S.matmat(np.eye(p)), full_matrices=False)
+        else:
+            v0 = np.random.default_rng(self.graine).standard_normal(min(n, p))
+            U, valeurs, Vt = svds(S, k=k, v0=v0)
+            ordre = np.argsort(-valeurs)
+            U, valeurs, Vt = U[:, ordre], valeurs[ordre], Vt[ordre]
+        U, Vt = oriente(U[:, :k], Vt[:k])
+        valeurs = valeurs[:k]
+
+        # Inertie totale (khi-deux / total), calculée sur les cases non nulles
+        P = P.tocoo()
+        poids = P.data ** 2 / (r[P.row] * c[P.col])
+        self.inertie_ = poids.sum() - 1
+        self.valeurs_propres_ = valeurs ** 2
+        self.parts_inertie_ = self.valeurs_propres_ / self.inertie_
+        self.masses_lignes_ = r
+        self.masses_colonnes_ = c
+        # Coordonnées principales
+        self.coord_lignes_ = U * valeurs * rInv[:, np.newaxis]
+        self.coord_colonnes_ = Vt.T * valeurs * cInv[:, np.newaxis]
+        # Contributions des lignes et des colonnes à chaque axe
+        self.ctr_lignes_ = U ** 2
+        self.ctr_colonnes_ = Vt.T ** 2
+        # Qualité de représentation : carré de la coordonnée / carré de la distance au
+        # profil moyen (distance du khi-deux)
+        distancesLignes = np.bincount(P.row, poids, minlength=n) * rInv ** 2 - (r > 0)
+        distancesColonnes = np.bincount(P.col, poids, minlength=p) * cInv ** 2 - (c > 0)
+        self.cos2_lignes_ = np.divide(self.coord_lignes_ ** 2, distancesLignes[:, np.newaxis],
+                                      out=np.zeros_like(self.coord_lignes_), where=distancesLignes[:, np.newaxis] > 1e-12)
+        self.cos2_colonnes_ = np.divide(self.coord_colonnes_ ** 2, distancesColonnes[:, np.newaxis],
+                                        out=np.zeros_like(self.coord_colonnes_), where=distancesColonnes[:, np.newaxis] > 1e-12)
+        return self
+
+
+# Moyennes et variances (divisées par n) mises à jour lot par lot, en combinant les
+# statistiques de chaque lot avec celles déjà vues (formule de Chan et al.)
+class MoyennesVariances:
+    def __init__(self):
+        self.n = 0
+        self.moyennes = None
+        self.m2 = None
+
+    def ajoute(self, lot):
+        nLot = lot.shape[0]
+        if nLot == 0:
+            return
+        moyennesLot = lot.mean(axis=0)
+        m2Lot = ((lot - moyennesLot) ** 2).sum(axis=0)
+        if self.n == 0:
+            self.n, self.moyennes, self.m2 = nLot, moyennesLot, m2Lot
+            return
+        n = self.n + nLot
+        ecart = moyennesLot - self.moyennes
+        self.moyennes = self.moyennes + ecart * nLot / n
+        self.m2 = self.m2 + m2Lot + ecart ** 2 * self.n * nLot / n
+        self.n = n
+
+    @property
+    def variances(self):
+        return self.m2 / self.n
+
+
+# Regroupe les lignes en lots d'au moins `taille` lignes ; le reste de la fin est
+# ajouté au dernier lot (partial_fit demande au moins nb_composantes lignes par lot)
+def lots_lignes(flux, taille):
+    precedent = None
+    attente = []
+    nbAttente = 0
+    for expediteurs, lignes in flux:
+        attente.append((expediteurs, lignes))
+        nbAttente += len(lignes)
+        if nbAttente >= taille:
+            if precedent is not None:
+                yield precedent
+            precedent = ([e for noms, l in attente for e in noms], np.vstack([l for noms, l in attente]))
+            attente = []
+            nbAttente = 0
+    if attente:
+        reste = ([e for noms, l in attente for e in noms], np.vstack([l for noms, l in attente]))
+        if precedent is None:
+            precedent = reste
+        else:
+            precedent = (precedent[0] + reste[0], np.vstack((precedent[1], reste[1])))
+    if precedent is not None:
+        yield precedent
+
+
+# ACP centrée-réduite sur des lignes lues par lots (par exemple FluxContingence), sans
+# garder tout le tableau : un premier passage calcule les moyennes et variances, un
+# second ajuste une IncrementalPCA de scikit-learn avec partial_fit. Avec toutes les
+# composantes (par défaut), les résultats sont ceux de PCA(svd_solver='full').
+class ACPIncrementale:
+    def __init__(self, nb_composantes=None, taille_lot=1000):
+        self.nb_composantes = nb_composantes
+        self.taille_lot = taille_lot
+
+    def fit(self, flux):
+        statistiques = MoyennesVariances()
+        for expediteurs, lignes in flux:
+            statistiques.ajoute(lignes)
+        self.n_samples_ = statistiques.n
+        self.mean_ = statistiques.moyennes
+        variances = statistiques.variances
+        self.scale_ = np.sqrt(variances)
+        self.scale_[self.scale_ < 10 * np.finfo(np.float64).eps] = 1
+        k = self.nb_composantes or len(self.mean_)
+        k = min(k, len(self.mean_), self.n_samples_)
+        self.acp = IncrementalPCA(n_components=k)
+        for expediteurs, lignes in lots_lignes(flux, max(self.taille_lot, k)):
+            self.acp.partial_fit(self.reduit(lignes))
+        self.components_ = self.acp.components_
+        self.explained_variance_ = self.acp.explained_variance_
+        self.explained_variance_ratio_ = self.acp.explained_variance_ratio_
+        return self
+
+    def reduit(self, lignes):
+        return (lignes - self.mean_) / self.scale_
+
+    # Les coordonnées des individus, lot par lot : (noms, coordonnées)
+    def transform_flux(self, flux):
+        for expediteurs, lignes in flux:
+            yield expediteurs, self.acp.transform(self.reduit(lignes))
+
+    def correlations(self):
+        n = self.n_samples_
+        return self.components_.T * np.sqrt((n - 1) / n * self.explained_variance_)
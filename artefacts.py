@@ -0,0 +1,174 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import itertools
+import tempfile
+import pandas
+import pyarrow as pa
+from stockage import DOSSIER, chemin, lire_table, nombre_lignes
+from indexInverse import IndexInverse, construit_index
+
+## Les données du dashboard, préparées une fois par le pipeline ##
+## Tout ce que le dashboard affiche (tables, données des graphiques,                  ##
+## comptes) est écrit dans un paquet d'artefacts : un dossier par version, avec un     ##
+## fichier Arrow IPC par table, l'index inversé de la recherche (indexInverse.py) et   ##
+## un manifest.json qui donne la version, les comptes et les fichiers. Le fichier     ##
+## ACTUEL donne la version à utiliser. Le dashboard ne lit que ce paquet ; les        ##
+## fichiers Arrow sont lus par memory-map (sans copie).                               ##
+
+DOSSIER_ARTEFACTS = os.path.join(DOSSIER, "artefacts")
+FORMAT = 3
+
+
+# Les listes (mots associés, itemsets) ne s'affichent pas dans les DataTable,
+# on les met sous forme de texte
+def listes_en_texte(df, colonnes):
+    df = df.copy()
+    for col in colonnes:
+        df[col] = df[col].map(", ".join)
+    return df
+
+
+# Les premières thématiques avec le nombre de mots les composant
+def mots_par_thematique(nom, nombre=10):
+    read = lire_table(nom, ["mainThematique", "wordsAssociated"])
+    dic = {}
+    for theme, mots in zip(read["mainThematique"], read["wordsAssociated"]):
+        dic[theme] = len(mots)
+    sorted_dic = sorted(dic.items(), key=lambda item: item[1], reverse=True)
+    dic = dict(itertools.islice(sorted_dic, nombre))
+    return pandas.DataFrame({"Thématiques": list(dic.keys()), "Nombre de mots": list(dic.values())})
+
+
+# Les premières lignes du tableau des individus, avec les 4 premières thématiques
+def apercu_individus(nom):
+    return lire_table(nom).reset_index().iloc[:5, 0:5]
+
+
+# Expéditeurs et thématiques sur le premier plan de l'AFC, et le tableau des thématiques
+def plan_afc():
+    afcColonnes = ["Dim 1", "Contribution 1", "Cos2 1", "Dim 2", "Contribution 2", "Cos2 2"]
+    afcExpediteurs = lire_table("afc_expediteurs", ["From"] + afcColonnes)
+    afcThematiques = lire_table("afc_thematiques", ["Thématique"] + afcColonnes)
+    afcPlan = pandas.concat([afcExpediteurs.rename(columns={"From": "Nom"}).assign(Type="Expéditeur"),
+                             afcThematiques.rename(columns={"Thématique": "Nom"}).assign(Type="Thématique")],
+                            ignore_index=True)
+    afcThematiques = afcThematiques.sort_values(by=["Contribution 1"], ascending=False).round(4)
+    return afcPlan, afcThematiques.reset_index(drop=True)
+
+
+# Toutes les tables du paquet, et les comptes affichés dans les textes
+def contenu():
+    exp = lire_table("exp_mails", ["From", "Nombre d'emails envoyés"])
+    exp["From"] = exp["From"].astype(str)
+    mails = lire_table("formatted_data", ['Message-ID', 'From', 'To', 'Subject', 'content'])
+    mails["From"] = mails["From"].astype(str)
+    afcPlan, afcThematiques = plan_afc()
+    tables = {
+        "mails": mails,
+        "map_reduce_apercu": lire_table("map_reduced_subject")[:20],
+        "thematiques": listes_en_texte(lire_table("clean_thematiques"), ["wordsAssociated"]),
+        "thematiques_mots": mots_par_thematique("clean_thematiques"),
+        "thematiques_mots2": mots_par_thematique("clean_thematiques2"),
+        "itemsets": listes_en_texte(lire_table("itemsetsFrequents"), ["Thématiques souvent associées"]),
+        "itemsets2": listes_en_texte(lire_table("itemsetsFrequents2"), ["Thématiques souvent associées"]),
+        "regles": listes_en_texte(lire_table("reglesEtCalculs"), ["A", "B"]),
+        "expediteurs_mails": exp.sort_values(by=["Nombre d'emails envoyés"], ascending=False),
+        "individus_apercu": apercu_individus("extracted_data"),
+        "individus_apercu2": apercu_individus("extracted_data2"),
+        "acp_valeurs_propres": lire_table("acp_valeurs_propres"),
+        "afc_valeurs_propres": lire_table("afc_valeurs_propres"),
+        "afc_plan": afcPlan,
+        "afc_thematiques": afcThematiques,
+    }
+    comptes = {
+        "mots": nombre_lignes("map_reduced_subject"),
+        "thematiques": nombre_lignes("clean_thematiques"),
+        "mails_thematiques": nombre_lignes("mails_thematiques"),
+    }
+    return tables, comptes
+
+
+# Une table dans un fichier Arrow IPC non compressé (lisible par memory-map)
+def ecrire_arrow(df, fichier):
+    table = pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None)
+    with pa.OSFile(fichier, "wb") as sortie:
+        with pa.ipc.new_file(sortie, table.schema) as ecrivain:
+            ecrivain.write_table(table)
+
+
+# Écrit le paquet et en fait la version actuelle. La version est l'empreinte du contenu :
+# les mêmes données donnent la même version.
+def genere_artefacts(dossier=DOSSIER_ARTEFACTS):
+    tables, comptes = contenu()
+    os.makedirs(dossier, exist_ok=True)
+    temporaire = tempfile.mkdtemp(prefix="paquet_", dir=dossier)
+    # mkdtemp ne donne les droits qu'au propriétaire
+    os.chmod(temporaire, 0o755)
+    empreinte = hashlib.sha256()
+    fichiers = {}
+    for nom in sorted(tables):
+        fichiers[nom] = nom + ".arrow"
+        ecrire_arrow(tables[nom], os.path.join(temporaire, fichiers[nom]))
+    construit_index(chemin("formatted_data"), chemin("mails_thematiques"), os.path.join(temporaire, "index"))
+    for fichier in sorted(fichiers.values()) + ["index/termes.arrow", "index/postings.bin", "index/stopwords.txt"]:
+        empreinte.update(fichier.encode())
+        with open(os.path.join(temporaire, fichier), "rb") as entree:
+            for bloc in iter(lambda: entree.read(1 << 20), b""):
+                empreinte.update(bloc)
+    empreinte.update(json.dumps(comptes, sort_keys=True).encode())
+    version = empreinte.hexdigest()[:16]
+    manifest = {"format": FORMAT, "version": version, "comptes": comptes, "tables": fichiers,
+                "index": "index"}
+    with open(os.path.join(temporaire, "manifest.json"), "w", encoding="utf-8") as sortie:
+        json.dump(manifest, sortie, ensure_ascii=False, indent=2)
+    destination = os.path.join(dossier, version)
+    if os.path.exists(destination):
+        shutil.rmtree(temporaire)
+    else:
+        os.rename(temporaire, destination)
+    # Le changement de version est atomique
+    with open(os.path.join(dossier, "ACTUEL.tmp"), "w") as sortie:
+        sortie.write(version)
+    os.replace(os.path.join(dossier, "ACTUEL.tmp"), os.path.join(dossier, "ACTUEL"))
+    return version
+
+
+# Le paquet de la version actuelle, lu par le dashboard
+class Artefacts:
+    def __init__(self, dossier=DOSSIER_ARTEFACTS):
+        with open(os.path.join(dossier, "ACTUEL")) as entree:
+            version = entree.read().strip()
+        self.dossier = os.path.join(dossier, version)
+        with open(os.path.join(self.dossier, "manifest.json"), encoding="utf-8") as entree:
+            self.manifest = json.load(entree)
+        if self.manifest["format"] != FORMAT:
+            raise ValueError("Paquet d'artefacts au format %s, format %d attendu" % (self.manifest["format"], FORMAT))
+        self.version = self.manifest["version"]
+        self.tables = {}
+        self.indexInverse = None
+
+    def compte(self, nom):
+        return self.manifest["comptes"][nom]
+
+    # La table Arrow est gardée : ses colonnes restent dans le fichier mappé en mémoire
+    def arrow(self, nom):
+        if nom not in self.tables:
+            source = pa.memory_map(os.path.join(self.dossier, self.manifest["tables"][nom]))
+            self.tables[nom] = pa.ipc.open_file(source).read_all()
+        return self.tables[nom]
+
+    def table(self, nom):
+        return self.arrow(nom).to_pandas()
+
+    def index(self):
+        if self.indexInverse is None:
+            self.indexInverse = IndexInverse(os.path.join(self.dossier, self.manifest["index"]))
+        return self.indexInverse
+
+
+if __name__ == '__main__':
+    # python artefacts.py [dossier] : à lancer à la fin du pipeline, depuis la racine du projet
+    print(genere_artefacts(*sys.argv[1:2]))
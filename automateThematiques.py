@@ -0,0 +1,122 @@
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+from tokenisation import tokenizer_projet
+
+## Attribution des thématiques aux sujets des mails, en un seul passage sur chaque sujet ##
+## Tous les mots des thématiques sont compilés une seule fois dans un automate          ##
+## d'Aho-Corasick : un mail reçoit une thématique dès qu'un de ses mots apparaît dans   ##
+## le sujet (même règle que la double boucle de mailsThematiques).                       ##
+
+
+# Les mots recherchés pour chaque thématique : la thématique elle-même, puis ses mots
+# associés (on commence à 1 car le premier mot associé est la thématique)
+def mots_recherches(df1):
+    themes = []
+    for thematique, wordsAssociated in zip(df1["mainThematique"], df1["wordsAssociated"]):
+        themes.append((thematique, [thematique] + list(wordsAssociated[1:])))
+    return themes
+
+
+class AutomateThematiques:
+    def __init__(self, df1):
+        themes = mots_recherches(df1)
+        self.noms = [thematique for thematique, mots in themes]
+        # Un mot vide est présent dans tous les sujets
+        self.toujours = frozenset(i for i, (thematique, mots) in enumerate(themes) if "" in mots)
+        # Pour chaque mot, les thématiques (numéros de ligne) qui le contiennent
+        motsThemes = {}
+        for i, (thematique, mots) in enumerate(themes):
+            for mot in mots:
+                if mot:
+                    motsThemes.setdefault(mot, set()).add(i)
+        if ahocorasick is not None:
+            self.automate = ahocorasick.Automaton()
+            for mot, numeros in motsThemes.items():
+                self.automate.add_word(mot, frozenset(numeros))
+            if len(motsThemes) > 0:
+                self.automate.make_automaton()
+            else:
+                self.automate = None
+        else:
+            self.construit(motsThemes)
+
+    # Version python de l'automate : transitions, liens d'échec, et pour chaque
+    # état les thématiques reconnues (en suivant aussi les liens d'échec)
+    def construit(self, motsThemes):
+        self.transitions = [{}]
+        self.sorties = [set()]
+        for mot, numeros in motsThemes.items():
+            etat = 0
+            for c in mot:
+                suivant = self.transitions[etat].get(c)
+                if suivant is None:
+                    suivant = len(self.transitions)
+                    self.transitions[etat][c] = suivant
+                    self.transitions.append({})
+                    self.sorties.append(set())
+                etat = suivant
+            self.sorties[etat] |= numeros
+        # Parcours en largeur pour les liens d'échec
+        self.echecs = [0] * len(self.transitions)
+        file = list(self.transitions[0].values())
+        for etat in file:
+            for c, suivant in self.transitions[etat].items():
+                echec = self.echecs[etat]
+                while echec and c not in self.transitions[echec]:
+                    echec = self.echecs[echec]
+                self.echecs[suivant] = self.transitions[echec].get(c, 0)
+                self.sorties[suivant] |= self.sorties[self.echecs[suivant]]
+                file.append(suivant)
+        self.sorties = [frozenset(sortie) for sortie in self.sorties]
+
+    # Les numéros des thématiques présentes dans le sujet
+    def numeros(self, sujet):
+        trouvees = set(self.toujours)
+        if ahocorasick is not None:
+            if self.automate is not None:
+                for fin, numeros in self.automate.iter(sujet):
+                    trouvees |= numeros
+            return trouvees
+        transitions = self.transitions
+        echecs = self.echecs
+        sorties = self.sorties
+        etat = 0
+        for c in sujet:
+            while etat and c not in transitions[etat]:
+                etat = echecs[etat]
+            etat = transitions[etat].get(c, 0)
+            if sorties[etat]:
+                trouvees |= sorties[etat]
+        return trouvees
+
+    # Les thématiques du mail, dans l'ordre du tableau des thématiques
+    def thematiques(self, sujet):
+        return [self.noms[i] for i in sorted(self.numeros(sujet))]
+
+
+# Variante par mots entiers : un index mot -> thématiques, interrogé avec les mots
+# du sujet découpés par le Tokenizer du MapReduce. Plus stricte que l'automate
+# ("gas" ne reconnaît plus "gasoline"), elle ne donne donc pas le même résultat.
+class IndexMotsThematiques:
+    def __init__(self, df1, tokenizer=None):
+        themes = mots_recherches(df1)
+        self.noms = [thematique for thematique, mots in themes]
+        self.tokenizer = tokenizer or tokenizer_projet()
+        self.index = {}
+        for i, (thematique, mots) in enumerate(themes):
+            for mot in mots:
+                self.index.setdefault(mot.lower(), set()).add(i)
+
+    def numeros(self, sujet):
+        trouvees = set()
+        for mot in self.tokenizer.tokenize(sujet):
+            numeros = self.index.get(mot)
+            if numeros:
+                trouvees |= numeros
+        return trouvees
+
+    def thematiques(self, sujet):
+        return [self.noms[i] for i in sorted(self.numeros(sujet))]
@@ -0,0 +1,409 @@
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas
+
+import map as mapReduce
+import embeddingsThematiques
+import minageItemsets
+from minageIncremental import MineurIncremental
+import tokenisation
+from automateThematiques import AutomateThematiques
+from formatageDonnees import nettoie_donnees
+from extractFrom import agrege_thematiques
+import pyarrow as pa
+from tablesPaginees import TablePaginee
+from cacheCallbacks import CacheCallbacks
+
+## Mesures de performance des différentes étapes du projet ##
+## Utilisation : python benchmarks.py <nom> [arguments]     ##
+
+# Quelques mots pour fabriquer des sujets de mails
+MOTS = ["meeting", "gas", "power", "report", "contract", "deal", "energy", "price",
+        "schedule", "update", "conference", "california", "market", "trading", "review",
+        "request", "agreement", "project", "budget", "call", "the", "for", "and", "re",
+        "fwd", "with", "your", "from", "2001", "q3", "enron", "online", "list", "weekly"]
+
+
+# Des mails au même format que le fichier brut d'Enron, pour mesurer sans les vraies données
+def mails_synthetiques(n, graine=0):
+    rng = np.random.default_rng(graine)
+    noms = np.array(["expediteur%d.nom" % i for i in range(max(1, n // 200))])
+    expediteurs = noms[rng.integers(0, len(noms), n)]
+    mots = np.array(MOTS)
+    sujets = [" ".join(mots[rng.integers(0, len(mots), k)]) for k in rng.integers(1, 8, n)]
+    df = pandas.DataFrame({
+        'Message-ID': ["<%d.JavaMail.evans@thyme>" % i for i in range(n)],
+        'Date': "Mon, 14 May 2001 16:39:00 -0700 (PDT)",
+        'From': ["frozenset({'%s@enron.com'})" % e for e in expediteurs],
+        'To': "frozenset({'destinataire@enron.com'})",
+        'Subject': sujets,
+        'content': ["Corps du mail %d" % i for i in range(n)],
+    })
+    # Quelques lignes décalées et quelques mails vides, comme dans le fichier brut
+    df.loc[rng.random(n) < 0.002, 'Message-ID'] = "decalage"
+    vides = rng.random(n) < 0.002
+    df.loc[vides, 'Subject'] = np.nan
+    df.loc[vides, 'content'] = np.nan
+    return df
+
+
+# Chronométrer une fonction, en prenant le meilleur de plusieurs essais
+def chrono(fonction, *args, essais=3):
+    meilleur = None
+    for i in range(essais):
+        start_time = time.time()
+        resultat = fonction(*args)
+        duree = time.time() - start_time
+        if meilleur is None or duree < meilleur:
+            meilleur = duree
+    return meilleur, resultat
+
+
+# L'ancienne version de formate_datas, ligne par ligne (référence)
+def formate_datas_iterrows(df):
+    df = df[['Message-ID', 'From', 'To', 'Subject', 'content']]
+    unwanted_ids = []
+    for index, row in df.iterrows():
+        row['From'] = re.search(r"frozenset\(\{('|\")(.*)@", row['From']).group(2)
+        if not(row['Message-ID'].startswith('<')):
+            unwanted_ids.append(index)
+        elif isinstance(row['content'], float):
+                if isinstance(row['Subject'], float):
+                    unwanted_ids.append(index)
+    return df.drop(unwanted_ids)
+
+
+def bench_formatage(n=100000, csv_file=None):
+    if csv_file is None:
+        df = mails_synthetiques(int(n))
+    else:
+        df = pandas.read_csv(csv_file, low_memory=False, header=0)
+    print("Formatage de %d mails" % len(df))
+    tempsAncien, ancien = chrono(formate_datas_iterrows, df, essais=1)
+    tempsNouveau, nouveau = chrono(nettoie_donnees, df)
+    # Les deux versions doivent garder les mêmes mails
+    assert ancien.index.equals(nouveau.index)
+    print("iterrows   : %f secondes" % tempsAncien)
+    print("vectorisé  : %f secondes (x%.1f)" % (tempsNouveau, tempsAncien / tempsNouveau))
+
+
+# Sans les données du projet, on utilise une petite liste de stopwords
+def stopwords_temporaires():
+    if not os.path.exists(tokenisation.FICHIER_STOPWORDS):
+        fichier = tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False)
+        fichier.write("the,for,and,with,your,from\n")
+        fichier.close()
+        tokenisation.FICHIER_STOPWORDS = fichier.name
+
+
+def bench_map(n=1000000):
+    stopwords_temporaires()
+    sujets = mails_synthetiques(int(n))[['Subject']].dropna()
+    print("MapReduce sur %d sujets" % len(sujets))
+    reference = None
+    for nb_workers in [1, 2, 4, 8]:
+        temps, resultat = chrono(mapReduce.split_row_parallele, sujets, 'Subject', None, nb_workers, essais=1)
+        if reference is None:
+            reference = (temps, resultat)
+        # Le nombre de processus ne doit pas changer le résultat
+        assert resultat.equals(reference[1])
+        print("%d processus : %f secondes (x%.1f)" % (nb_workers, temps, reference[0] / temps))
+
+
+# Coût par mot : l'ancien filtre (recherche dans la chaîne des stop words, regex
+# recompilée à chaque mot) contre le Tokenizer
+def bench_tokenizer(n=200000):
+    stopwords_temporaires()
+    tokenizer = tokenisation.tokenizer_projet()
+    stop = ",".join(sorted(tokenizer.stopwords))
+    sujets = mails_synthetiques(int(n))['Subject'].dropna().tolist()
+
+    def ancien(sujets):
+        mots = []
+        for sujet in sujets:
+            x = re.split(tokenisation.SEPARATEURS, sujet.lower())
+            mots.extend(item for item in x if item not in stop and len(item) > 2 and not bool(re.search("[0-9]+", item)))
+        return mots
+
+    def nouveau(sujets):
+        mots = []
+        for sujet in sujets:
+            mots.extend(tokenizer.tokenize(sujet))
+        return mots
+
+    nbMots = sum(len(re.split(tokenisation.SEPARATEURS, sujet)) for sujet in sujets)
+    tempsAncien, _ = chrono(ancien, sujets)
+    tempsNouveau, _ = chrono(nouveau, sujets)
+    print("%d mots bruts" % nbMots)
+    print("ancien filtre : %.0f ns/mot" % (tempsAncien / nbMots * 1e9))
+    print("Tokenizer     : %.0f ns/mot (x%.1f)" % (tempsNouveau / nbMots * 1e9, tempsAncien / tempsNouveau))
+
+
+# Un tableau de thématiques au format de clean_thematiques
+def thematiques_synthetiques(nb=66, graine=0):
+    rng = np.random.default_rng(graine)
+    lettres = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    vocabulaire = MOTS + ["".join(rng.choice(lettres, rng.integers(4, 9))) for i in range(nb * 4)]
+    themes = []
+    for i in range(nb):
+        mots = [vocabulaire[j] for j in rng.choice(len(vocabulaire), rng.integers(1, 6), replace=False)]
+        themes.append((mots[0], mots))
+    return pandas.DataFrame(themes, columns=["mainThematique", "wordsAssociated"])
+
+
+# L'ancienne attribution des thématiques : une boucle sur toutes les thématiques pour chaque mail
+def thematiques_double_boucle(df, df1):
+    mailsThematiques = []
+    for mailTraite in df.iterrows():
+        newMailRow = []
+        for rowThemes in df1.iterrows():
+            thematique = rowThemes[1].mainThematique
+            subject = mailTraite[1].Subject
+            wordsAssociated = rowThemes[1].wordsAssociated
+            if(thematique in subject):
+                newMailRow.append(thematique)
+            else:
+                exist = False
+                count = 1
+                while not exist and count < len(wordsAssociated):
+                    if (wordsAssociated[count] in subject):
+                        exist = True
+                        newMailRow.append(thematique)
+                    count += 1
+        if newMailRow:
+            mailsThematiques.append((mailTraite[0], mailTraite[1].From, newMailRow))
+    return mailsThematiques
+
+
+def thematiques_automate(df, df1):
+    automate = AutomateThematiques(df1)
+    mailsThematiques = []
+    for idMail, From, subject in zip(df.index, df['From'], df['Subject']):
+        newMailRow = automate.thematiques(subject)
+        if newMailRow:
+            mailsThematiques.append((idMail, From, newMailRow))
+    return mailsThematiques
+
+
+# L'ancienne version est mesurée sur un échantillon puis extrapolée
+def bench_thematiques(echantillon=2000):
+    df1 = thematiques_synthetiques()
+    for n in [100000, 1000000]:
+        df = nettoie_donnees(mails_synthetiques(n))[['From', 'Subject']].dropna()
+        extrait = df.iloc[:int(echantillon)]
+        tempsAncien, ancien = chrono(thematiques_double_boucle, extrait, df1, essais=1)
+        assert ancien == thematiques_automate(extrait, df1)
+        tempsAncien = tempsAncien * len(df) / len(extrait)
+        tempsNouveau, _ = chrono(thematiques_automate, df, df1, essais=1)
+        print("%d mails, %d thématiques" % (len(df), len(df1)))
+        print("double boucle : %f secondes (extrapolé)" % tempsAncien)
+        print("automate      : %f secondes (x%.0f)" % (tempsNouveau, tempsAncien / tempsNouveau))
+
+
+# Vocabulaire synthétique : des groupes de 10 mots, chaque sujet tire ses mots dans un groupe
+def bench_embeddings(nb_mots=100000, graine=0):
+    nb_mots = int(nb_mots)
+    rng = np.random.default_rng(graine)
+    mots = np.array(["mot%s" % "".join(chr(97 + int(c)) for c in str(i)) for i in range(nb_mots)])
+    groupes = rng.integers(0, nb_mots // 10, 20 * nb_mots)
+    sujets = [" ".join(mots[10 * g + rng.integers(0, 10, 3)]) for g in groupes]
+    stopwords_temporaires()
+    df1 = pandas.DataFrame({"Subject": embeddingsThematiques.vocabulaire(sujets, compte_min=1)})
+    print("%d mots, %d sujets" % (len(df1), len(sujets)))
+    for methode in ["kmeans", "voisins"]:
+        temps, thematiques = chrono(embeddingsThematiques.create_thematiques, "Subject", df1, sujets,
+                                    None, methode, None, 0.8, 50, essais=1)
+        print("%s : %f secondes, %d thématiques" % (methode, temps, len(thematiques)))
+
+# Les thématiques de chaque mail : quelques thématiques parmi 66, les premières plus fréquentes
+def transactions_synthetiques(n, nb=66, graine=0):
+    rng = np.random.default_rng(graine)
+    noms = np.array(["theme%02d" % i for i in range(nb)])
+    probas = 1 / np.arange(1, nb + 1)
+    probas = probas / probas.sum()
+    return [list(dict.fromkeys(noms[rng.choice(nb, k, p=probas)])) for k in rng.integers(1, 6, n)]
+
+
+# Temps et pic de mémoire d'une fonction
+def chrono_memoire(fonction, *args):
+    tracemalloc.start()
+    start_time = time.time()
+    resultat = fonction(*args)
+    duree = time.time() - start_time
+    pic = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return duree, pic, resultat
+
+
+def bench_itemsets(n=100000, seuil=100):
+    transactions = transactions_synthetiques(int(n))
+    seuil = int(seuil)
+    print("%d transactions, support minimum %d" % (len(transactions), seuil))
+    resultats = {}
+    try:
+        import pyfpgrowth
+        resultats["pyfpgrowth"] = chrono_memoire(pyfpgrowth.find_frequent_patterns, transactions, seuil)
+    except ImportError:
+        pyfpgrowth = None
+    for mode in minageItemsets.MODES:
+        resultats[mode] = chrono_memoire(minageItemsets.itemsets_frequents, transactions, seuil, mode)
+    for nom, (duree, pic, motifs) in resultats.items():
+        print("%-10s : %f secondes, %.1f Mo, %d itemsets" % (nom, duree, pic / 1e6, len(motifs)))
+    if pyfpgrowth is not None:
+        assert list(resultats["pyfpgrowth"][2].items()) == list(resultats["compatible"][2].items())
+        regles = pyfpgrowth.generate_association_rules(resultats["pyfpgrowth"][2], 0.8)
+        assert list(regles.items()) == list(minageItemsets.regles_association(resultats["compatible"][2], 0.8).items())
+    assert resultats["exact"][2] == resultats["eclat"][2]
+
+
+# L'ancien filtrage de FP-growth.py, sur les premières lignes seulement
+def filtre_double_boucle(patterns_df, lignes):
+    unwanted_patterns = []
+    for iter1 in range(lignes):
+        countSubsets = 0
+        countSameCount = 0
+        for iter2 in range(len(patterns_df)):
+            if len(patterns_df['pattern'][iter1]) != len(patterns_df['pattern'][iter2]) and \
+                    set(patterns_df['pattern'][iter1]).issubset(patterns_df['pattern'][iter2]):
+                countSubsets += 1
+                if patterns_df['count'][iter1] == patterns_df['count'][iter2] or\
+                    patterns_df['count'][iter2]/patterns_df['count'][iter1] >= 0.5:
+                        countSameCount += 1
+        if countSameCount == countSubsets and countSubsets != 0:
+            unwanted_patterns.append(iter1)
+    return unwanted_patterns
+
+
+# Beaucoup de motifs : des mails avec jusqu'à 10 thématiques parmi 30, support faible
+def bench_filtrage(n=100000, seuil=20, echantillon=20):
+    rng = np.random.default_rng(0)
+    noms = np.array(["theme%02d" % i for i in range(30)])
+    probas = 1 / np.arange(1, 31)
+    probas = probas / probas.sum()
+    transactions = [list(dict.fromkeys(noms[rng.choice(30, k, p=probas)])) for k in rng.integers(1, 11, int(n))]
+    patterns = minageItemsets.itemsets_frequents(transactions, int(seuil), "exact")
+    patterns = {motif: nb for motif, nb in patterns.items() if len(motif) > 1}
+    patterns_df = pandas.DataFrame({'pattern': [list(motif) for motif in patterns], 'count': list(patterns.values())})
+    echantillon = min(int(echantillon), len(patterns_df))
+    tempsAncien, unwanted = chrono(filtre_double_boucle, patterns_df, echantillon, essais=1)
+    tempsAncien = tempsAncien * len(patterns_df) / echantillon
+    print("%d motifs" % len(patterns))
+    print("double boucle : %f secondes (extrapolé)" % tempsAncien)
+    for filtre in ["ratio", "fermes", "maximaux"]:
+        temps, gardes = chrono(minageItemsets.filtre_motifs, patterns, filtre, essais=1)
+        print("%-8s : %f secondes, %d motifs gardés" % (filtre, temps, len(gardes)))
+        if filtre == "ratio":
+            enleves = [i for i, motif in enumerate(list(patterns)[:echantillon]) if motif not in gardes]
+            assert enleves == unwanted
+
+
+# Les mails arrivent par lots : après chaque lot, les itemsets et les règles du mode
+# incrémental doivent être ceux d'une recherche complète sur tous les mails reçus
+def bench_incremental(n=200000, lots=20, seuil=100):
+    n, lots, seuil = int(n), int(lots), int(seuil)
+    transactions = transactions_synthetiques(n)
+    mineur = MineurIncremental(compaction=5)
+    tempsIncremental = 0
+    tempsComplet = 0
+    taille = (n + lots - 1) // lots
+    for debut in range(0, n, taille):
+        start_time = time.time()
+        mineur.ajoute(transactions[debut:debut + taille], range(debut, debut + taille))
+        motifs = mineur.motifs(seuil)
+        regles = minageItemsets.regles_association(motifs, 0.8)
+        tempsIncremental += time.time() - start_time
+        start_time = time.time()
+        complets = minageItemsets.itemsets_frequents(transactions[:debut + taille], seuil, "exact")
+        reglesCompletes = minageItemsets.regles_association(complets, 0.8)
+        tempsComplet += time.time() - start_time
+        assert motifs == complets
+        assert regles == reglesCompletes
+    print("%d transactions en %d lots, %d itemsets" % (n, lots, len(motifs)))
+    print("recherches complètes : %f secondes" % tempsComplet)
+    print("incrémental          : %f secondes" % tempsIncremental)
+
+
+# L'ancienne agrégation de extract_data : concaténation des listes puis list.count
+def agrege_listes(df):
+    new_df = df.groupby(['From'], sort=False)['Thematiques'].apply(lambda x: x.sum())
+    list_dic = []
+    for personne in new_df:
+        compte = {k: personne.count(k) for k in set(personne)}
+        list_dic.append(compte)
+    mails_df = df.groupby(['From'], sort=False).count()
+    mails_df["Dictionnaire des thématiques"] = list_dic
+    return mails_df
+
+
+# Peu d'expéditeurs, donc des dizaines de milliers de mails chacun
+def bench_extraction(n=500000, nbExpediteurs=20):
+    rng = np.random.default_rng(0)
+    expediteurs = np.array(["expediteur%d.nom" % i for i in range(int(nbExpediteurs))])
+    df = pandas.DataFrame({'From': expediteurs[rng.integers(0, len(expediteurs), int(n))],
+                           'Thematiques': transactions_synthetiques(int(n))})
+    tempsAncien, ancien = chrono(agrege_listes, df, essais=1)
+    tempsNouveau, nouveau = chrono(agrege_thematiques, df, essais=1)
+    assert ancien.equals(nouveau)
+    print("%d mails, %d expéditeurs" % (len(df), len(ancien)))
+    print("concaténation des listes : %f secondes" % tempsAncien)
+    print("explode + groupby        : %f secondes (x%.1f)" % (tempsNouveau, tempsAncien / tempsNouveau))
+
+
+# Des visites répétées des pages d'une table triée et filtrée, avec et sans le cache
+# des callbacks (les mêmes pages sont revues, comme en naviguant d'avant en arrière)
+def bench_cache(n=1000000, visites=200, pages=20):
+    n, visites, pages = int(n), int(visites), int(pages)
+    rng = np.random.default_rng(0)
+    table = pa.table({"Subject": [" ".join(rng.choice(MOTS, 4)) for _ in range(n)],
+                      "lift": rng.random(n)})
+    tri = [{"column_id": "lift", "direction": "desc"}]
+    filtre = "{Subject} contains gas"
+    numeros = rng.integers(0, pages, visites)
+
+    # Une seule TablePaginee, comme dans le dashboard : son tri et son filtre sont calculés
+    # avant les mesures, seul le coût du cache des callbacks est comparé
+    paginee = TablePaginee(table)
+    paginee.page(0, 10, tri, filtre)
+
+    def visite(page):
+        return paginee.page(page, 10, tri, filtre)
+    cache = CacheCallbacks("bench")
+    visiteCache = cache.memoise(visite)
+
+    def sans_cache():
+        return [visite(int(i)) for i in numeros]
+
+    def avec_cache():
+        return [visiteCache(int(i)) for i in numeros]
+    tempsSans, resultats = chrono(sans_cache, essais=1)
+    tempsAvec, resultatsCache = chrono(avec_cache, essais=1)
+    assert resultats == resultatsCache
+    print("%d lignes, %d visites de %d pages différentes" % (n, visites, pages))
+    print("sans cache : %f secondes" % tempsSans)
+    print("avec cache : %f secondes (x%.1f)" % (tempsAvec, tempsSans / tempsAvec))
+    print(cache.metriques())
+
+
+BENCHMARKS = {
+    "formatage": bench_formatage,
+    "map": bench_map,
+    "tokenizer": bench_tokenizer,
+    "thematiques": bench_thematiques,
+    "embeddings": bench_embeddings,
+    "itemsets": bench_itemsets,
+    "filtrage": bench_filtrage,
+    "incremental": bench_incremental,
+    "extraction": bench_extraction,
+    "cache": bench_cache,
+}
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print("Benchmarks disponibles : %s" % ", ".join(BENCHMARKS))
+    else:
+        BENCHMARKS[sys.argv[1]](*sys.argv[2:])
@@ -0,0 +1,63 @@
+from collections import OrderedDict
+
+## Cache LRU de taille bornée : au-delà de `taille` éléments, ##
+## on oublie ceux utilisés le moins récemment.                ##
+
+_ABSENT = object()
+
+
+class LRU:
+    def __init__(self, taille=100000):
+        self.taille = taille
+        self.valeurs = OrderedDict()
+        self.succes = 0
+        self.echecs = 0
+
+    def __len__(self):
+        return len(self.valeurs)
+
+    def __contains__(self, cle):
+        return cle in self.valeurs
+
+    def get(self, cle, defaut=None):
+        valeur = self.valeurs.get(cle, _ABSENT)
+        if valeur is _ABSENT:
+            self.echecs += 1
+            return defaut
+        self.succes += 1
+        self.valeurs.move_to_end(cle)
+        return valeur
+
+    def put(self, cle, valeur):
+        self.valeurs[cle] = valeur
+        self.valeurs.move_to_end(cle)
+        while len(self.valeurs) > self.taille:
+            self.valeurs.popitem(last=False)
+
+    def items(self):
+        return self.valeurs.items()
+
+
+# Bornée aussi par la taille totale des valeurs : `mesure` donne la taille d'une valeur
+# (en octets pour des bytes). Une valeur plus grande que la borne n'est pas gardée.
+class LRUOctets(LRU):
+    def __init__(self, taille=100000, octets=64 * 2 ** 20, mesure=len):
+        super().__init__(taille)
+        self.octets = octets
+        self.mesure = mesure
+        self.tailles = {}
+        self.total = 0
+
+    def put(self, cle, valeur):
+        taille = self.mesure(valeur)
+        if cle in self.tailles:
+            self.total -= self.tailles.pop(cle)
+            del self.valeurs[cle]
+        if taille > self.octets:
+            return
+        self.valeurs[cle] = valeur
+        self.tailles[cle] = taille
+        self.total += taille
+        while len(self.valeurs) > self.taille or self.total > self.octets:
+            ancienne, _ = self.valeurs.popitem(last=False)
+            self.total -= self.tailles.pop(ancienne)
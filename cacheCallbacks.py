@@ -0,0 +1,99 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+import tempfile
+import threading
+from functools import wraps
+from cache import LRUOctets
+
+## Mémoïsation des callbacks du dashboard ##
+## Le résultat d'un callback est gardé pour ses paramètres et pour la version du       ##
+## paquet d'artefacts : un nouveau paquet ne réutilise jamais les anciens résultats.   ##
+## Les résultats sont gardés sérialisés (pickle) dans un LRU borné en nombre et en      ##
+## octets, et si un dossier est donné, aussi sur disque pour les autres processus      ##
+## (workers gunicorn) qui servent le même paquet. Le dossier n'est pas borné : rien    ##
+## n'y est jamais supprimé, même les dossiers des anciennes versions. Il faut les       ##
+## supprimer à part (par exemple après chaque nouveau paquet).                         ##
+
+
+class CacheCallbacks:
+    def __init__(self, version, taille=1000, octets=64 * 2 ** 20, dossier=None):
+        self.version = version
+        self.memoire = LRUOctets(taille, octets)
+        # Un dossier par version, pour supprimer facilement les anciennes versions
+        self.dossier = os.path.join(dossier, version) if dossier else None
+        if self.dossier:
+            os.makedirs(self.dossier, exist_ok=True)
+        self.verrou = threading.Lock()
+        self.mesures = {}
+
+    def cle(self, nom, parametres):
+        texte = json.dumps([self.version, nom, parametres], sort_keys=True, default=str)
+        return hashlib.sha256(texte.encode()).hexdigest()
+
+    def compte(self, nom, resultat, duree=0.0):
+        with self.verrou:
+            mesure = self.mesures.setdefault(nom, {"memoire": 0, "disque": 0, "echecs": 0, "duree_calculs": 0.0})
+            mesure[resultat] += 1
+            mesure["duree_calculs"] += duree
+
+    def lit(self, cle):
+        with self.verrou:
+            valeur = self.memoire.get(cle)
+        if valeur is not None:
+            return valeur, "memoire"
+        if self.dossier:
+            try:
+                with open(os.path.join(self.dossier, cle + ".pkl"), "rb") as entree:
+                    valeur = entree.read()
+            except FileNotFoundError:
+                return None, "echecs"
+            with self.verrou:
+                self.memoire.put(cle, valeur)
+            return valeur, "disque"
+        return None, "echecs"
+
+    def ecrit(self, cle, valeur):
+        with self.verrou:
+            self.memoire.put(cle, valeur)
+        if self.dossier:
+            # Écrit à côté puis renommé : un autre processus ne lit jamais un fichier à moitié écrit
+            descripteur, temporaire = tempfile.mkstemp(dir=self.dossier, suffix=".tmp")
+            with os.fdopen(descripteur, "wb") as sortie:
+                sortie.write(valeur)
+            os.replace(temporaire, os.path.join(self.dossier, cle + ".pkl"))
+
+    # Décorateur : à placer sous @app.callback. nom distingue les fonctions de même nom.
+    def memoise(self, fonction=None, nom=None):
+        if fonction is None:
+            return lambda f: self.memoise(f, nom)
+        nom = nom or fonction.__name__
+
+        @wraps(fonction)
+        def memoisee(*args):
+            cle = self.cle(nom, args)
+            valeur, resultat = self.lit(cle)
+            if valeur is not None:
+                self.compte(nom, resultat)
+                return pickle.loads(valeur)
+            debut = time.perf_counter()
+            retour = fonction(*args)
+            self.compte(nom, "echecs", time.perf_counter() - debut)
+            self.ecrit(cle, pickle.dumps(retour, protocol=pickle.HIGHEST_PROTOCOL))
+            return retour
+        return memoisee
+
+    # Succès (en mémoire, sur disque) et échecs de chaque fonction, et occupation du LRU
+    def metriques(self):
+        with self.verrou:
+            return {
+                "version": self.version,
+                "entrees": len(self.memoire),
+                "octets": self.memoire.total,
+                "octets_max": self.memoire.octets,
+                "succes": self.memoire.succes,
+                "echecs": self.memoire.echecs,
+                "fonctions": {nom: dict(mesure) for nom, mesure in self.mesures.items()},
+            }
@@ -0,0 +1,84 @@
+import os
+import pickle
+from nltk import WordNetLemmatizer
+from nltk.corpus import wordnet
+from cache import LRU
+
+## Cache des appels à WordNet pour le regroupement des mots en thématiques ##
+## Les lemmes, les synsets de chaque mot et les similarités de Wu-Palmer   ##
+## sont calculés une seule fois, et peuvent être gardés sur disque pour    ##
+## les exécutions suivantes.                                               ##
+
+FICHIER_CACHE = "visualisation/data/cache_wordnet.pkl"
+
+
+class CacheWordnet:
+    def __init__(self, taille=200000, fichier=None):
+        self.fichier = fichier
+        # Un seul lemmatizer pour tous les mots
+        self.lemmatizer = WordNetLemmatizer()
+        self.lemmes = LRU(taille)
+        self.synsetsMots = LRU(taille)
+        self.similarites = LRU(taille)
+        if fichier is not None and os.path.exists(fichier):
+            self.charge(fichier)
+
+    # On enlève les mots au pluriel
+    def lemme(self, mot):
+        lemme = self.lemmes.get(mot)
+        if lemme is None:
+            lemme = self.lemmatizer.lemmatize(mot)
+            self.lemmes.put(mot, lemme)
+        return lemme
+
+    # Les synsets du mot (une liste vide si le mot n'existe pas dans wordnet)
+    def synsets(self, mot):
+        synsets = self.synsetsMots.get(mot)
+        if synsets is None:
+            synsets = wordnet.synsets(mot)
+            self.synsetsMots.put(mot, synsets)
+        elif len(synsets) > 0 and isinstance(synsets[0], str):
+            # Chargé depuis le disque : on retrouve les synsets à partir de leur nom
+            synsets = [wordnet.synset(nom) for nom in synsets]
+            self.synsetsMots.put(mot, synsets)
+        return synsets
+
+    # On prend juste le premier
+    def premier_synset(self, mot):
+        synsets = self.synsets(mot)
+        if len(synsets) == 0:
+            return None
+        return synsets[0]
+
+    # Similarité de Wu-Palmer entre deux synsets (0 si wordnet ne sait pas la calculer)
+    def similarite(self, synset1, synset2):
+        cle = (synset1.name(), synset2.name())
+        similarity = self.similarites.get(cle)
+        if similarity is None:
+            similarity = synset1.wup_similarity(synset2)
+            if similarity is None:
+                similarity = 0
+            self.similarites.put(cle, similarity)
+        return similarity
+
+    # Sur disque, les synsets sont gardés par leur nom
+    def sauvegarde(self, fichier=None):
+        fichier = fichier or self.fichier
+        contenu = {
+            "lemmes": dict(self.lemmes.items()),
+            "synsets": {mot: [s if isinstance(s, str) else s.name() for s in synsets]
+                        for mot, synsets in self.synsetsMots.items()},
+            "similarites": dict(self.similarites.items()),
+        }
+        with open(fichier, "wb") as sortie:
+            pickle.dump(contenu, sortie)
+
+    def charge(self, fichier):
+        with open(fichier, "rb") as entree:
+            contenu = pickle.load(entree)
+        for mot, lemme in contenu["lemmes"].items():
+            self.lemmes.put(mot, lemme)
+        for mot, synsets in contenu["synsets"].items():
+            self.synsetsMots.put(mot, synsets)
+        for cle, similarity in contenu["similarites"].items():
+            self.similarites.put(cle, similarity)
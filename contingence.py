@@ -0,0 +1,163 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas
+import pyarrow as pa
+import pyarrow.parquet as pq
+from scipy import sparse
+
+## Tableau de contingence expéditeurs x thématiques ##
+## Construit en un seul passage dans une matrice creuse (CSR) : seules les cases non    ##
+## nulles sont gardées, avec les noms des lignes (expéditeurs) et des colonnes          ##
+## (thématiques). Le tableau n'est transformé en DataFrame complet que sur demande.     ##
+
+# Les mails d'un paquet d'expéditeurs (FluxContingence)
+SCHEMA_PAQUET = pa.schema([('From', pa.string()), ('Thematiques', pa.list_(pa.string()))])
+
+
+class TableauContingence:
+    def __init__(self, matrice, expediteurs, thematiques):
+        self.matrice = sparse.csr_matrix(matrice)
+        self.expediteurs = list(expediteurs)
+        self.thematiques = list(thematiques)
+        self.numeroExpediteur = {expediteur: i for i, expediteur in enumerate(self.expediteurs)}
+        self.numeroThematique = {thematique: j for j, thematique in enumerate(self.thematiques)}
+
+    @property
+    def shape(self):
+        return self.matrice.shape
+
+    # Le DataFrame complet, au format de l'ancien tableau_acp
+    def dense(self):
+        tableau = pandas.DataFrame(self.matrice.toarray(), index=self.expediteurs, columns=self.thematiques)
+        tableau.index.name = 'From'
+        return tableau
+
+    # Les thématiques d'un expéditeur, sans les zéros
+    def ligne(self, expediteur):
+        i = self.numeroExpediteur[expediteur]
+        debut, fin = self.matrice.indptr[i], self.matrice.indptr[i + 1]
+        return {self.thematiques[j]: int(nb) for j, nb in zip(self.matrice.indices[debut:fin], self.matrice.data[debut:fin])}
+
+
+# Numéros des noms, en ajoutant à la fin ceux qui ne sont pas encore connus
+def numeros(noms, connus):
+    numerosConnus = {nom: i for i, nom in enumerate(connus)}
+    resultat = np.empty(len(noms), dtype=np.int64)
+    for k, nom in enumerate(noms):
+        numero = numerosConnus.get(nom)
+        if numero is None:
+            numero = len(connus)
+            numerosConnus[nom] = numero
+            connus.append(nom)
+        resultat[k] = numero
+    return resultat
+
+
+# À partir de couples (expéditeur, thématique) avec leur nombre : les couples répétés
+# sont additionnés. Les thématiques absentes de la liste donnée sont ajoutées à la fin.
+def depuis_couples(expediteurs, thematiques, comptes=None, listeExpediteurs=None, listeThematiques=None):
+    listeExpediteurs = list(listeExpediteurs) if listeExpediteurs is not None else []
+    listeThematiques = list(listeThematiques) if listeThematiques is not None else []
+    lignes = numeros(expediteurs, listeExpediteurs)
+    colonnes = numeros(thematiques, listeThematiques)
+    if comptes is None:
+        comptes = np.ones(len(lignes), dtype=np.int64)
+    matrice = sparse.coo_matrix((np.asarray(comptes, dtype=np.int64), (lignes, colonnes)),
+                                shape=(len(listeExpediteurs), len(listeThematiques)))
+    # La conversion en CSR additionne les couples répétés
+    return TableauContingence(matrice.tocsr(), listeExpediteurs, listeThematiques)
+
+
+# À partir du dictionnaire des thématiques de chaque expéditeur (exp_mails)
+def depuis_dictionnaires(expediteurs, dictionnaires, listeThematiques=None):
+    lignes = []
+    colonnes = []
+    comptes = []
+    for expediteur, dictionnaire in zip(expediteurs, dictionnaires):
+        for thematique, nb in dictionnaire.items():
+            lignes.append(expediteur)
+            colonnes.append(thematique)
+            comptes.append(nb)
+    # Les expéditeurs sans thématique gardent leur ligne
+    return depuis_couples(lignes, colonnes, comptes, list(expediteurs), listeThematiques)
+
+
+# Place en mémoire des comptes (expéditeur, thématique) gardés pour un mail, dans le
+# pire des cas où chaque mail apporte de nouveaux couples (environ 150 octets par couple
+# dans une Series pandas, deux thématiques par mail en moyenne)
+OCTETS_PAR_MAIL = 300
+
+
+# Le nombre de paquets pour que les comptes d'un paquet tiennent dans le budget mémoire
+# (en octets), d'après le nombre de mails donné par les métadonnées du fichier
+def nombre_paquets(fichier, memoire):
+    return max(1, int(np.ceil(pq.read_metadata(fichier).num_rows * OCTETS_PAR_MAIL / memoire)))
+
+
+# Les lignes du tableau de contingence sans le construire en entier, directement à partir
+# de la table des mails étiquetés lue par morceaux. Les mails sont d'abord répartis en
+# paquets selon un hachage de l'expéditeur (tous les mails d'un expéditeur vont dans le
+# même paquet). Chaque paquet est ensuite relu par morceaux de taille_lecture mails :
+# seuls les comptes (expéditeur, thématique) du paquet sont gardés, et ses lignes sont
+# rendues par lots d'au plus taille_lignes expéditeurs. Le nombre de paquets est calculé
+# avec le budget `memoire` s'il n'est pas donné.
+class FluxContingence:
+    def __init__(self, fichier, thematiques, nb_paquets=None, taille_lecture=100000, min_mails=0, dossier=None,
+                 memoire=256 * 2 ** 20, taille_lignes=10000):
+        self.thematiques = list(thematiques)
+        self.min_mails = min_mails
+        self.taille_lecture = taille_lecture
+        self.taille_lignes = taille_lignes
+        if nb_paquets is None:
+            nb_paquets = nombre_paquets(fichier, memoire)
+        self.dossier = dossier or tempfile.mkdtemp(prefix="contingence_")
+        self.paquets = [os.path.join(self.dossier, "paquet_%03d.parquet" % i) for i in range(nb_paquets)]
+        ecrivains = {}
+        try:
+            for morceau in pq.ParquetFile(fichier).iter_batches(batch_size=taille_lecture, columns=['From', 'Thematiques']):
+                df = morceau.to_pandas()
+                df['From'] = df['From'].astype(str)
+                numeros = pandas.util.hash_array(df['From'].to_numpy(dtype=object)) % nb_paquets
+                for i, paquet in df.groupby(numeros):
+                    table = pa.Table.from_pandas(paquet, schema=SCHEMA_PAQUET, preserve_index=False)
+                    if i not in ecrivains:
+                        ecrivains[i] = pq.ParquetWriter(self.paquets[i], SCHEMA_PAQUET)
+                    ecrivains[i].write_table(table)
+        finally:
+            for ecrivain in ecrivains.values():
+                ecrivain.close()
+        self.paquets = [paquet for paquet in self.paquets if os.path.exists(paquet)]
+
+    # Le nombre de mails de chaque expéditeur d'un paquet et les comptes des couples
+    # (expéditeur, thématique), additionnés morceau par morceau
+    def comptes(self, paquet):
+        nbMails = []
+        comptes = []
+        for morceau in pq.ParquetFile(paquet).iter_batches(batch_size=self.taille_lecture):
+            df = morceau.to_pandas()
+            couples = df.explode('Thematiques')
+            couples = couples[couples['Thematiques'].isin(self.thematiques)]
+            nbMails = [pandas.concat(nbMails + [df.groupby('From', sort=False).size()]).groupby(level=0, sort=False).sum()]
+            comptes = [pandas.concat(comptes + [couples.groupby(['From', 'Thematiques'], sort=False).size()])
+                       .groupby(level=[0, 1], sort=False).sum()]
+        return nbMails[0], comptes[0]
+
+    # Pour chaque lot d'expéditeurs : leurs noms et leurs lignes (tableau dense, une
+    # colonne par thématique ; les thématiques inconnues sont ignorées)
+    def __iter__(self):
+        for paquet in self.paquets:
+            nbMails, comptes = self.comptes(paquet)
+            expediteurs = nbMails.index[nbMails >= self.min_mails]
+            comptes = comptes[comptes.index.get_level_values(0).isin(expediteurs)]
+            tableau = depuis_couples(comptes.index.get_level_values(0).tolist(),
+                                     comptes.index.get_level_values(1).tolist(),
+                                     comptes.to_numpy(dtype=np.int64),
+                                     listeExpediteurs=expediteurs, listeThematiques=self.thematiques)
+            for debut in range(0, len(tableau.expediteurs), self.taille_lignes):
+                fin = debut + self.taille_lignes
+                yield tableau.expediteurs[debut:fin], tableau.matrice[debut:fin].toarray()
+
+    def nettoie(self):
+        shutil.rmtree(self.dossier, ignore_errors=True)
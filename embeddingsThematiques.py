@@ -0,0 +1,199 @@
+import numpy as np
+import pandas
+from collections import Counter
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+from stockage import ecrire_table, lire_table
+from tokenisation import tokenizer_projet
+from metriques import Metriques
+from thematique import extractThematique
+
+## Regroupement des mots en thématiques à partir de vecteurs de mots ##
+## Chaque mot est représenté par un vecteur dense, soit lu dans un fichier     ##
+## d'embeddings (format texte word2vec / GloVe), soit calculé sur les sujets   ##
+## des mails (co-occurrences). Les mots sont ensuite regroupés par k-means     ##
+## par mini-lots, ou par recherche des voisins proches. Contrairement à        ##
+## WordNet, tous les mots du corpus ont un vecteur, et le coût ne croît pas    ##
+## avec le carré du vocabulaire.                                               ##
+
+
+# Le vocabulaire des sujets : les mots apparaissant au moins compte_min fois,
+# du plus fréquent au moins fréquent (comme map_reduced_subject)
+def vocabulaire(sujets, compte_min=200, tokenizer=None):
+    tokenizer = tokenizer or tokenizer_projet()
+    compte = Counter()
+    for sujet in sujets:
+        compte.update(tokenizer.tokenize(sujet))
+    compte = pandas.Series(compte, dtype="int64").sort_index()
+    compte = compte.sort_values(ascending=False, kind="stable")
+    return compte[compte >= compte_min].index.tolist()
+
+
+# Les vecteurs d'un fichier d'embeddings : une ligne par mot, le mot puis ses valeurs.
+# On ne garde que les mots demandés, le fichier est lu ligne par ligne.
+def vecteurs_fichier(fichier, mots):
+    numeros = {mot: i for i, mot in enumerate(mots)}
+    vecteurs = {}
+    with open(fichier, encoding="utf-8", errors="ignore") as entree:
+        for ligne in entree:
+            valeurs = ligne.rstrip().split(" ")
+            # La première ligne du format word2vec donne seulement les dimensions
+            if len(valeurs) <= 2:
+                continue
+            if valeurs[0] in numeros and valeurs[0] not in vecteurs:
+                vecteurs[valeurs[0]] = np.asarray(valeurs[1:], dtype=np.float32)
+    connus = np.array([mot in vecteurs for mot in mots])
+    if len(vecteurs) == 0:
+        return connus, np.zeros((0, 0), dtype=np.float32)
+    return connus, np.vstack([vecteurs[mot] for mot in mots if mot in vecteurs])
+
+
+# Les vecteurs calculés sur le corpus : matrice de co-occurrence des mots dans les
+# sujets, pondérée par PPMI puis réduite par SVD tronquée (tout reste creux jusqu'à la SVD)
+def vecteurs_cooccurrence(sujets, mots, dimension=100, tokenizer=None):
+    tokenizer = tokenizer or tokenizer_projet()
+    numeros = {mot: i for i, mot in enumerate(mots)}
+    lignes = []
+    colonnes = []
+    for i, sujet in enumerate(sujets):
+        presents = {numeros[mot] for mot in tokenizer.tokenize(sujet) if mot in numeros}
+        lignes.extend([i] * len(presents))
+        colonnes.extend(presents)
+    documents = sparse.csr_matrix((np.ones(len(lignes), dtype=np.float32), (lignes, colonnes)),
+                                  shape=(len(sujets), len(mots)))
+    cooccurrences = (documents.T @ documents).tocoo()
+    # On enlève la diagonale (un mot avec lui-même)
+    garder = cooccurrences.row != cooccurrences.col
+    cooccurrences = sparse.coo_matrix((cooccurrences.data[garder], (cooccurrences.row[garder], cooccurrences.col[garder])),
+                                      shape=cooccurrences.shape)
+    total = cooccurrences.sum()
+    sommes = np.asarray(cooccurrences.sum(axis=1)).ravel()
+    pmi = np.log(cooccurrences.data * total / (sommes[cooccurrences.row] * sommes[cooccurrences.col]))
+    positifs = pmi > 0
+    ppmi = sparse.csr_matrix((pmi[positifs], (cooccurrences.row[positifs], cooccurrences.col[positifs])),
+                             shape=cooccurrences.shape)
+    connus = np.asarray(ppmi.getnnz(axis=1) > 0)
+    ppmi = ppmi[connus]
+    if ppmi.shape[0] == 0:
+        return connus, np.zeros((0, 0), dtype=np.float32)
+    dimension = max(1, min(dimension, ppmi.shape[1] - 1))
+    return connus, TruncatedSVD(n_components=dimension, random_state=0).fit_transform(ppmi).astype(np.float32)
+
+
+# Au-delà, k-means par mini-lots coûte trop cher (le coût croît avec le nombre de groupes)
+NB_THEMATIQUES_MAX = 500
+
+
+# Le nombre de groupes par défaut : un pour 10 mots, sans dépasser NB_THEMATIQUES_MAX
+def nb_groupes(nb_mots):
+    return max(1, min(nb_mots // 10, NB_THEMATIQUES_MAX))
+
+
+# K-means par mini-lots sur les vecteurs normalisés (proche d'une distance cosinus)
+def groupes_kmeans(vecteurs, nb_thematiques, taille_lot=4096):
+    nb_thematiques = max(1, min(nb_thematiques, len(vecteurs)))
+    kmeans = MiniBatchKMeans(n_clusters=nb_thematiques, batch_size=taille_lot, n_init=1, random_state=0)
+    return kmeans.fit_predict(vecteurs)
+
+
+# Index approché des voisins (LSH par hyperplans aléatoires) : dans chaque table, le code
+# d'un mot est le signe de ses produits avec nb_bits vecteurs aléatoires, et deux mots
+# proches (cosinus) ont souvent le même début de code. Les mots sont triés par code, et
+# chacun n'est comparé qu'aux `fenetre` mots suivants : le coût est linéaire en nombre
+# de mots, et chaque mot a au plus 2 x nb_tables x fenetre voisins candidats.
+class IndexLSH:
+    def __init__(self, nb_tables=12, nb_bits=16, fenetre=12, graine=0):
+        self.nb_tables = nb_tables
+        self.nb_bits = nb_bits
+        self.fenetre = fenetre
+        self.graine = graine
+
+    def fit(self, vecteurs):
+        self.vecteurs = np.asarray(vecteurs, dtype=np.float32)
+        rng = np.random.default_rng(self.graine)
+        poids = 1 << np.arange(self.nb_bits - 1, -1, -1, dtype=np.int64)
+        self.ordres = []
+        for table in range(self.nb_tables):
+            hyperplans = rng.standard_normal((self.vecteurs.shape[1], self.nb_bits)).astype(np.float32)
+            codes = (self.vecteurs @ hyperplans > 0) @ poids
+            self.ordres.append(np.argsort(codes, kind="stable"))
+        return self
+
+    # Les couples de mots (i, j) dont la similarité cosinus dépasse le seuil
+    # (les vecteurs doivent être normalisés)
+    def couples(self, seuil):
+        lignes = []
+        colonnes = []
+        for ordre in self.ordres:
+            tries = self.vecteurs[ordre]
+            for decalage in range(1, min(self.fenetre, len(ordre) - 1) + 1):
+                similarites = np.einsum("ij,ij->i", tries[:-decalage], tries[decalage:])
+                proches = np.flatnonzero(similarites >= seuil)
+                lignes.append(ordre[proches])
+                colonnes.append(ordre[proches + decalage])
+        if not lignes:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(lignes), np.concatenate(colonnes)
+
+
+# Deux mots sont proches si leur similarité cosinus dépasse le seuil ; une thématique
+# est un groupe de mots reliés de proche en proche. Les couples proches sont cherchés
+# avec l'index LSH, sans comparer toutes les paires de mots.
+def groupes_voisins(vecteurs, seuil=0.65, index=None):
+    index = (index or IndexLSH()).fit(vecteurs)
+    lignes, colonnes = index.couples(seuil)
+    graphe = sparse.coo_matrix((np.ones(len(lignes), dtype=np.int8), (lignes, colonnes)),
+                               shape=(len(vecteurs), len(vecteurs)))
+    return connected_components(graphe, directed=False)[1]
+
+
+# Même format de sortie que create_thematiques (thematique.py) : pour chaque thématique,
+# la liste de ses mots, le plus fréquent en premier. Un mot sans vecteur forme sa propre
+# thématique, comme un mot inconnu de wordnet.
+def create_thematiques(col, df, sujets=None, fichier=None, methode="kmeans", nb_thematiques=None,
+                       seuil=0.65, dimension=100):
+    mots = df[col].tolist()
+    if fichier is not None:
+        connus, vecteurs = vecteurs_fichier(fichier, mots)
+    else:
+        connus, vecteurs = vecteurs_cooccurrence(sujets, mots, dimension)
+    groupes = np.full(len(mots), -1)
+    if len(vecteurs) > 0:
+        vecteurs = normalize(vecteurs)
+        if methode == "kmeans":
+            if nb_thematiques is None:
+                nb_thematiques = nb_groupes(len(vecteurs))
+            groupes[connus] = groupes_kmeans(vecteurs, nb_thematiques)
+        elif methode == "voisins":
+            groupes[connus] = groupes_voisins(vecteurs, seuil)
+        else:
+            raise ValueError("méthode inconnue : %s" % methode)
+    realThematiques = []
+    numeroThematique = {}
+    for mot, groupe in zip(mots, groupes):
+        if groupe < 0:
+            realThematiques.append([mot])
+        elif groupe not in numeroThematique:
+            numeroThematique[groupe] = len(realThematiques)
+            realThematiques.append([mot])
+        else:
+            realThematiques[numeroThematique[groupe]].append(mot)
+    print("Nous passons de %d à %d thématiques " % (len(mots), len(realThematiques)))
+    return realThematiques
+
+
+if __name__ == '__main__':
+    metriques = Metriques("embeddingsThematiques")
+    sujets = lire_table("formatted_data", ['Subject'])['Subject'].dropna().tolist()
+    # Sans la coupure du MapReduce, on peut garder beaucoup plus de mots
+    with metriques.etape("vocabulaire", len(sujets)):
+        df1 = pandas.DataFrame({"Subject": vocabulaire(sujets, compte_min=20)})
+    with metriques.etape("clustering", len(df1)):
+        thematiques1 = create_thematiques("Subject", df1, sujets)
+    thematiques1 = extractThematique(thematiques1)
+    thematiques1 = pandas.DataFrame(thematiques1, columns=["mainThematique","wordsAssociated"])
+    ecrire_table(thematiques1, "clean_thematiques_embeddings")
+    metriques.ecrit_json()
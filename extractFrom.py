@@ -1,94 +1,118 @@
+import sys
 from pandas import *
+import pandas
 import numpy as np
-from sklearn.decomposition import PCA
-from sklearn.preprocessing import StandardScaler
 import plotly.express as px
 import matplotlib.pyplot as plt
+from stockage import chemin, ecrire_table, lire_table
+from contingence import FluxContingence, TableauContingence, depuis_dictionnaires
+from analyseFactorielle import ACP, ACPIncrementale, AFC
+
+# Pour chaque expéditeur : son nombre de mails et le dictionnaire de ses thématiques.
+# Les listes de thématiques sont dépliées une seule fois (une ligne par couple
+# expéditeur, thématique), puis les couples sont comptés en un seul groupby.
+def agrege_thematiques(df):
+    mails_df = df.groupby(['From'], sort=False).count()
+    couples = df[['From', 'Thematiques']].explode('Thematiques')
+    comptes = couples.groupby(['From', 'Thematiques'], sort=False).size()
+    dictionnaires = {}
+    for (expediteur, thematique), nb in comptes.items():
+        dictionnaires.setdefault(expediteur, {})[thematique] = int(nb)
+    mails_df["Dictionnaire des thématiques"] = [dictionnaires.get(expediteur, {}) for expediteur in mails_df.index]
+    return mails_df
 
-# Récupérer les thématiques associées à un mail
-def retrieve_thematiques(stringToChange):
-    wordsAssociated = stringToChange
-    wordsAssociated = wordsAssociated.replace("[", "")
-    wordsAssociated = wordsAssociated.replace("]", "")
-    wordsAssociated = wordsAssociated.replace(",", "")
-    wordsAssociated = wordsAssociated.replace("'", "")
-    wordsAssociated = wordsAssociated.split(" ")
-    return wordsAssociated
-
-
-def extract_data(csv_file):
-    df = pandas.read_csv(csv_file, low_memory=False, header=0)
-    df = df[['From', 'Thematiques']]
-    thematiques = []
-    for row in df['Thematiques']:
-        thematiques.append(retrieve_thematiques(row))
-    df['Thematiques'] = thematiques
-    new_df = df.groupby(['From'], sort=False)['Thematiques'].apply(lambda x: x.sum())
-    list_dic = []
-    for personne in new_df:
-        compte = {k: personne.count(k) for k in set(personne)}
-        list_dic.append(compte)
 
-    mails_df = df.groupby(['From'], sort=False).count()
-    mails_df["Dictionnaire des thématiques"] = list_dic
+def extract_data(nom):
+    df = lire_table(nom, ['From', 'Thematiques'])
+    # Les expéditeurs sont encodés en dictionnaire dans le fichier, on regroupe sur les noms
+    df['From'] = df['From'].astype(str)
+    mails_df = agrege_thematiques(df)
     mails_df = mails_df.query('Thematiques>=50')
     mails_df = mails_df.rename(columns={"Thematiques": "Nombre d\'emails envoyés"})
-    mails_df.to_csv("visualisation/data/exp_mails.csv")
+    ecrire_table(mails_df.reset_index(), "exp_mails", dictionnaire=["From"])
     return mails_df
 
 
 # Return le tableau de contingence sur lequel on déroulera l'AFC
-# Les expéditeurs et les thématiques de leurs mails envoyés
-def tableau_acp(dataframe):
-    df1 = pandas.read_csv("visualisation/data/clean_thematiques.csv", low_memory=False, header=0)
-    columns = []
-    # Une ligne vide, qui va ensuite prendre les thématiques associées à l'expéditeur
-    emptyRow = []
-    # On récupère les différentes thématiques
-    for thematiques in df1["mainThematique"]:
-        emptyRow.append(0)
-        columns.append(thematiques)
-    # les expéditeurs avec leurs thématiques
-    expThematiques = pandas.DataFrame(columns=columns)
-    list_exp = []
-    # Pour chaque expéditeur
-    for expediteur in dataframe.iterrows():
-        dico = expediteur[1][1]
-        # On crée une nouvelle ligne avec des 0
-        newExpRow = emptyRow
-        # On en fait un dataframe comprenant toutes les colonnes voulues
-        newExpRow = pandas.DataFrame(data=np.array([newExpRow]), columns=columns)
-        # On indique qui est l'expéditeur
-        list_exp.append(expediteur[0])
-        # On met à jour ses thématiques selon le dictionnaire de ses thématiques
-        for key, value in dico.items():
-            newExpRow[key] = value
-        # Puis on ajoute notre expediteur avec ses thématiques dans le dataframe
-        expThematiques = pandas.concat([expThematiques, newExpRow], ignore_index=True)
-    # On a fini d'attribuer les différentes thématiques aux expéditeurs
-    expThematiques.index = list_exp
-    expThematiques = expThematiques.rename(index={'null': 'From'})
+# Les expéditeurs et les thématiques de leurs mails envoyés, construit en une fois dans
+# une matrice creuse ; dense=False rend le TableauContingence sans le DataFrame complet
+def tableau_acp(dataframe, dense=True):
+    df1 = lire_table("clean_thematiques", ["mainThematique"])
+    tableau = depuis_dictionnaires(dataframe.index, dataframe["Dictionnaire des thématiques"], df1["mainThematique"])
+    if not dense:
+        return tableau
+    expThematiques = tableau.dense()
     print(expThematiques)
     return expThematiques
 
 
-def acp(tab_acp):
-    columns = tab_acp.columns.values
-    X = tab_acp
+# tab_acp : le DataFrame du tableau de contingence, ou le TableauContingence creux
+# (le tableau n'est alors jamais construit en entier)
+def acp(tab_acp, nb_composantes=10):
+    if isinstance(tab_acp, TableauContingence):
+        X = tab_acp.matrice
+        columns = tab_acp.thematiques
+    else:
+        X = tab_acp
+        columns = tab_acp.columns.values
     # nombre d'observations
     n = X.shape[0]
     # nombre de variables
     p = X.shape[1]
-    # instanciation
-    sc = StandardScaler()
-    # transformation – centrage
-    Z = sc.fit_transform(X)
-    acp = PCA(svd_solver='full')
-    coord = acp.fit_transform(Z)
+    # centrage-réduction fait à la volée, seules les premières composantes sont calculées
+    acp = ACP(nb_composantes)
+    coord = acp.fit_transform(X)
     eigenvalues = acp.explained_variance_ratio_[:10]
     eigEx = acp.explained_variance_
     plot_valeurs_propres(eigenvalues)
-    plot_factor_variable2(X,eigEx,eigenvalues,n,p,acp)
+    plot_factor_variable2(columns,eigEx,eigenvalues,n,p,acp)
+
+# Les parts d'inertie des premières composantes, pour le diagramme du dashboard
+# (le dashboard n'a ainsi pas à refaire l'ACP)
+def valeurs_propres(tab_acp, nb=10):
+    acp = ACP(nb).fit(tab_acp)
+    return pandas.DataFrame({"Dimension": range(1, len(acp.explained_variance_ratio_) + 1),
+                             "Part d'inertie": acp.explained_variance_ratio_})
+
+
+# L'AFC du tableau de contingence (creux) : les valeurs propres, puis pour les expéditeurs
+# et pour les thématiques leurs coordonnées, contributions et cos² sur chaque axe
+def resultats_afc(tableau, nb_axes=10):
+    afc = AFC(nb_axes).fit(tableau.matrice)
+    axes = range(1, len(afc.valeurs_propres_) + 1)
+    valeurs = pandas.DataFrame({"Dimension": list(axes),
+                                "Valeur propre": afc.valeurs_propres_,
+                                "Part d'inertie": afc.parts_inertie_})
+    tables = []
+    for nom, noms, coord, ctr, cos2 in [("From", tableau.expediteurs, afc.coord_lignes_, afc.ctr_lignes_, afc.cos2_lignes_),
+                                       ("Thématique", tableau.thematiques, afc.coord_colonnes_, afc.ctr_colonnes_, afc.cos2_colonnes_)]:
+        table = pandas.DataFrame({nom: noms})
+        for k in axes:
+            table["Dim %d" % k] = coord[:, k - 1]
+            table["Contribution %d" % k] = ctr[:, k - 1]
+            table["Cos2 %d" % k] = cos2[:, k - 1]
+        tables.append(table)
+    return valeurs, tables[0], tables[1]
+
+
+# ACP en flux sur tous les expéditeurs (pas seulement ceux d'au moins 50 mails) : les
+# lignes du tableau sont produites par paquets à partir de la table des mails étiquetés
+def acp_flux(nom, nb_composantes=None, min_mails=0, taille_lot=1000):
+    df1 = lire_table("clean_thematiques", ["mainThematique"])
+    flux = FluxContingence(chemin(nom), df1["mainThematique"], min_mails=min_mails)
+    try:
+        acp = ACPIncrementale(nb_composantes, taille_lot).fit(flux)
+        morceaux = []
+        for expediteurs, coord in acp.transform_flux(flux):
+            morceau = pandas.DataFrame(coord, columns=["Dim %d" % (k + 1) for k in range(coord.shape[1])])
+            morceau.insert(0, "From", expediteurs)
+            morceaux.append(morceau)
+    finally:
+        flux.nettoie()
+    valeurs = pandas.DataFrame({"Dimension": range(1, len(acp.explained_variance_ratio_) + 1),
+                                "Part d'inertie": acp.explained_variance_ratio_})
+    return acp, valeurs, pandas.concat(morceaux, ignore_index=True)
+
 
 # Diagramme en barre des valeurs propres
 def plot_valeurs_propres(eigenvalues):
@@ -97,11 +121,9 @@ def plot_valeurs_propres(eigenvalues):
 
 
 def nuages_individus1(tablePCA):
-    sc = StandardScaler()  # transformation–centrage-réduction
-    Z = sc.fit_transform(tablePCA)
-    print(Z)
-    acpp = PCA(n_components=10)
-    coord = acpp.fit_transform(Z)
+    # centrage-réduction fait par l'ACP
+    acpp = ACP(10)
+    coord = acpp.fit_transform(tablePCA)
 
     #positionnement des individus dans lepremier plan
     fig, axes = plt.subplots(figsize=(15,15))
@@ -125,17 +147,9 @@ def nuages_individus1(tablePCA):
     plt.show()
 
 def nuages_individus(tabAFC):
-    columns = tabAFC.columns.values
-    # Centré et réduire les données
-    scaler = StandardScaler()
-    scaler.fit(tabAFC)
-    Z = scaler.transform(tabAFC)
-
-    # ACP
-    acp = PCA(n_components=10)
-    coord = acp.fit_transform(Z)
-    acp.fit(Z)
-    results = acp.fit_transform(Z)
+    # ACP sur les données centrées-réduites
+    acp = ACP(10)
+    coord = acp.fit_transform(tabAFC)
     # #placement des étiquettes des observations
     n = 66
     for i in range(n):
@@ -145,11 +159,12 @@ def nuages_individus(tabAFC):
 
 
 # Nuage des variables
-def plot_factor_variable2(X,eigEx,eigenvalues,n,p,acp):
+# columns : les noms des variables ; seules les composantes calculées sont utilisées
+def plot_factor_variable2(columns,eigEx,eigenvalues,n,p,acp):
     eigval = (n - 1) / n * eigEx
     sqrt_eigval = np.sqrt(eigval)
-    corvar = np.zeros((p, p))
-    for k in range(p):
+    corvar = np.zeros((p, len(eigEx)))
+    for k in range(len(eigEx)):
         corvar[:, k] = acp.components_[k, :] * sqrt_eigval[k]
 
     # cercle des corrélations
@@ -162,7 +177,7 @@ def plot_factor_variable2(X,eigEx,eigenvalues,n,p,acp):
                   dx=corvar[j, 0], dy=corvar[j, 1],
                   head_width=0.03, head_length=0.03,
                   length_includes_head=True)
-        plt.annotate(X.columns[j], (corvar[j, 0], corvar[j, 1]))
+        plt.annotate(columns[j], (corvar[j, 0], corvar[j, 1]))
 
     # ajouter les axes
     plt.plot([-1, 1], [0, 0], color='silver', linestyle='-', linewidth=1)
@@ -179,8 +194,20 @@ def plot_factor_variable2(X,eigEx,eigenvalues,n,p,acp):
     plt.show()
 
 if __name__ == '__main__':
-    df = extract_data("visualisation/data/mails_thematiques.csv")
+    # python extractFrom.py --flux : ACP de tous les expéditeurs, lus par paquets
+    if "--flux" in sys.argv:
+        acpFlux, valeurs, coordonnees = acp_flux("mails_thematiques")
+        ecrire_table(valeurs, "acp_flux_valeurs_propres")
+        ecrire_table(coordonnees, "acp_flux_expediteurs", dictionnaire=["From"])
+        sys.exit()
+    df = extract_data("mails_thematiques")
+    # AFC directement sur le tableau creux
+    valeurs, expediteurs, thematiques = resultats_afc(tableau_acp(df, dense=False))
+    ecrire_table(valeurs, "afc_valeurs_propres")
+    ecrire_table(expediteurs, "afc_expediteurs")
+    ecrire_table(thematiques, "afc_thematiques")
     df = tableau_acp(df)
-    df.to_csv("visualisation/data/extracted_data.csv")
+    ecrire_table(df, "extracted_data", index=True)
+    ecrire_table(valeurs_propres(df), "acp_valeurs_propres")
     nuages_individus1(df)
     acp(df)
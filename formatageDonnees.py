@@ -1,29 +1,79 @@
-import re
+import pandas
+import pyarrow as pa
+import pyarrow.parquet as pq
 from pandas import *
+from stockage import chemin
+from metriques import Metriques, Progression
 
-def formate_datas(csv_file):
-    df = pandas.read_csv(csv_file, low_memory=False, header=0)
+# Les colonnes que l'on garde pour la suite
+COLONNES = ['Message-ID', 'From', 'To', 'Subject', 'content']
+# Le schéma du fichier de sortie (fixé, pour que tous les morceaux aient les mêmes types)
+SCHEMA = pa.schema([(col, pa.string()) for col in COLONNES] + [('idEmail', pa.int64())])
+# Pour récupérer le nom de l'expéditeur dans "frozenset({'nom@domaine'})"
+MOTIF_EXPEDITEUR = r"frozenset\(\{(?:'|\")(.*)@"
+
+
+# Nettoyage colonne par colonne, sans boucler sur les lignes
+def nettoie_donnees(df):
+    df = df[COLONNES].copy()
+
+    #pour formatter les 'From' pour n'avoir que le nom de l'expéditeur
+    #(on garde la valeur brute si le motif n'est pas trouvé)
+    noms = df['From'].str.extract(MOTIF_EXPEDITEUR, expand=False)
+    df['From'] = noms.fillna(df['From'])
 
-    df = df[['Message-ID', 'From', 'To', 'Subject', 'content']]
+    # pour formatter les 'To' pour n'avoir que le nom du destinataire
+    #df['To'] = df['To'].str.extract(MOTIF_EXPEDITEUR, expand=False)
+
+    #pour enlever les mails qui ne sont pas au bon format
+    bon_format = df['Message-ID'].str.startswith('<', na=False)
+    #et ceux qui n'ont ni contenu, ni sujet
+    vide = df['content'].isna() & df['Subject'].isna()
+    return df[bon_format & ~vide]
+
+
+def formate_datas(csv_file):
+    df = pandas.read_csv(csv_file, low_memory=False, header=0, usecols=COLONNES)
+    return nettoie_donnees(df)
 
-    unwanted_ids = []
-    for index, row in df.iterrows():
-        #pour formatter les 'From' pour n'avoir que le nom de l'expéditeur
-        row['From'] = re.search(r"frozenset\(\{('|\")(.*)@", row['From']).group(2)
 
-        # pour formatter les 'To' pour n'avoir que le nom du destinataire
-        #row['To'] = re.search(r"frozenset\(\{('|\")(.*)@", row['To']).group(2)
+# Le morceau au format Arrow, l'index (numéro de la ligne dans le fichier brut) devient idEmail
+def vers_table(df):
+    df = df.astype(object).where(df.notna(), None)
+    df.index.name = 'idEmail'
+    return pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=True)
 
-        #pour enlever les mails qui ne sont pas au bon format
-        if not(row['Message-ID'].startswith('<')):
-            unwanted_ids.append(index)
-        elif isinstance(row['content'], float):
-                if isinstance(row['Subject'], float):
-                    unwanted_ids.append(index)
 
-    new_df = df.drop(unwanted_ids)
-    return (new_df)
+# Version en flux : le fichier est lu par morceaux de taille fixe, chaque morceau
+# est nettoyé puis ajouté au fichier de sortie (un groupe de lignes Parquet par
+# morceau). La mémoire utilisée ne dépend que de la taille des morceaux, pas de
+# celle du fichier.
+def formate_datas_flux(csv_file, output_file, chunksize=50000, metriques=None):
+    if metriques is None:
+        metriques = Metriques("formatageDonnees")
+    nbGardes = 0
+    progression = Progression("Lignes", pas=10 * chunksize)
+    with metriques.etape("formatage") as etape:
+        morceaux = pandas.read_csv(csv_file, low_memory=False, header=0, usecols=COLONNES, chunksize=chunksize)
+        sortie = None
+        for morceau in morceaux:
+            progression.avance(len(morceau))
+            morceau = nettoie_donnees(morceau)
+            nbGardes += len(morceau)
+            # L'index continue d'un morceau à l'autre, on garde donc les mêmes numéros de ligne
+            table = vers_table(morceau)
+            if sortie is None:
+                # Le schéma du premier morceau contient aussi les métadonnées pandas (l'index)
+                sortie = pq.ParquetWriter(output_file, table.schema)
+            sortie.write_table(table)
+        if sortie is not None:
+            sortie.close()
+        etape["nb"] = progression.nb
+        etape["gardes"] = nbGardes
+    print("%d mails gardés sur %d" % (nbGardes, progression.nb))
+    return nbGardes
 
 if __name__ == '__main__':
-    df = formate_datas("visualisation/data/donnees_data_science.csv")
-    df.to_csv("visualisation/data/formatted_data.csv")
\ No newline at end of file
+    metriques = Metriques("formatageDonnees")
+    formate_datas_flux("visualisation/data/donnees_data_science.csv", chemin("formatted_data"), metriques=metriques)
+    metriques.ecrit_json()
@@ -0,0 +1,161 @@
+import os
+import zlib
+from array import array
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from tokenisation import Tokenizer, lit_stopwords, tokenizer_projet
+
+## Index inversé des mails, pour la recherche du dashboard ##
+## Pour chaque terme, la liste triée des numéros des mails qui le contiennent (numéro  ##
+## de ligne dans formatted_data, donc aussi dans la table "mails" du paquet           ##
+## d'artefacts). Trois champs : "mot" (sujet et contenu, découpés par le Tokenizer du   ##
+## MapReduce), "expediteur" et "thematique". Les listes sont stockées en écarts        ##
+## uint32 compressés avec zlib, les unes à la suite des autres dans postings.bin ;     ##
+## termes.arrow donne pour chaque terme sa position dans ce fichier.                   ##
+
+CHAMPS = ("mot", "expediteur", "thematique")
+
+
+# Les couples (terme, mail) d'un champ sont gardés dans deux tableaux compacts
+class Couples:
+    def __init__(self):
+        self.numeros = {}
+        self.termes = array('I')
+        self.mails = array('I')
+
+    def ajoute(self, termes, mail):
+        for terme in termes:
+            numero = self.numeros.get(terme)
+            if numero is None:
+                numero = len(self.numeros)
+                self.numeros[terme] = numero
+            self.termes.append(numero)
+            self.mails.append(mail)
+
+    # Les listes de chaque terme : (terme, numéros des mails triés)
+    def listes(self):
+        noms = list(self.numeros)
+        termes = np.frombuffer(self.termes, dtype=np.uint32)
+        mails = np.frombuffer(self.mails, dtype=np.uint32)
+        if len(termes) == 0:
+            return
+        ordre = np.lexsort((mails, termes))
+        termes, mails = termes[ordre], mails[ordre]
+        bornes = np.flatnonzero(np.diff(termes)) + 1
+        for debut, fin in zip(np.r_[0, bornes], np.r_[bornes, len(termes)]):
+            yield noms[termes[debut]], mails[debut:fin]
+
+
+def compresse(mails):
+    return zlib.compress(np.diff(mails, prepend=np.uint32(0)).astype('<u4').tobytes())
+
+
+def decompresse(bloc):
+    return np.cumsum(np.frombuffer(zlib.decompress(bloc), dtype='<u4'), dtype=np.uint32)
+
+
+# Construit l'index dans le dossier, à partir de la table des mails formatés et des
+# thématiques associées à chaque mail (idEmail -> Thematiques)
+def construit_index(fichier_mails, fichier_thematiques, dossier, tokenizer=None, taille_lecture=20000):
+    tokenizer = tokenizer or tokenizer_projet()
+    couples = {champ: Couples() for champ in CHAMPS}
+    thematiques = pq.read_table(fichier_thematiques, columns=['idEmail', 'Thematiques']).to_pydict()
+    thematiques = dict(zip(thematiques['idEmail'], thematiques['Thematiques']))
+    mail = 0
+    for morceau in pq.ParquetFile(fichier_mails).iter_batches(batch_size=taille_lecture,
+                                                             columns=['idEmail', 'From', 'Subject', 'content']):
+        colonnes = morceau.to_pydict()
+        for idEmail, expediteur, sujet, contenu in zip(colonnes['idEmail'], colonnes['From'],
+                                                       colonnes['Subject'], colonnes['content']):
+            couples["mot"].ajoute(set(tokenizer.tokenize((sujet or "") + "\n" + (contenu or ""))), mail)
+            if expediteur:
+                couples["expediteur"].ajoute((str(expediteur).lower(),), mail)
+            couples["thematique"].ajoute(set(thematiques.get(idEmail) or ()), mail)
+            mail += 1
+    os.makedirs(dossier, exist_ok=True)
+    lignes = {"champ": [], "terme": [], "debut": [], "taille": [], "nombre": []}
+    position = 0
+    with open(os.path.join(dossier, "postings.bin"), "wb") as sortie:
+        for champ in CHAMPS:
+            for terme, mails in sorted(couples[champ].listes()):
+                bloc = compresse(mails)
+                sortie.write(bloc)
+                lignes["champ"].append(champ)
+                lignes["terme"].append(terme)
+                lignes["debut"].append(position)
+                lignes["taille"].append(len(bloc))
+                lignes["nombre"].append(len(mails))
+                position += len(bloc)
+    table = pa.table({"champ": pa.array(lignes["champ"], pa.string()),
+                      "terme": pa.array(lignes["terme"], pa.string()),
+                      "debut": pa.array(lignes["debut"], pa.uint64()),
+                      "taille": pa.array(lignes["taille"], pa.uint32()),
+                      "nombre": pa.array(lignes["nombre"], pa.uint32())})
+    with pa.OSFile(os.path.join(dossier, "termes.arrow"), "wb") as sortie:
+        with pa.ipc.new_file(sortie, table.schema) as ecrivain:
+            ecrivain.write_table(table)
+    # Les requêtes seront découpées avec les mêmes stop words
+    with open(os.path.join(dossier, "stopwords.txt"), "w") as sortie:
+        sortie.write("\n".join(sorted(tokenizer.stopwords)))
+    return mail
+
+
+class IndexInverse:
+    def __init__(self, dossier):
+        self.dossier = dossier
+        self.termes = pa.ipc.open_file(pa.memory_map(os.path.join(dossier, "termes.arrow"))).read_all()
+        self.postings = pa.memory_map(os.path.join(dossier, "postings.bin"))
+        self.tokenizer = Tokenizer(lit_stopwords(os.path.join(dossier, "stopwords.txt")))
+        self.positions = None
+
+    # Le dictionnaire (champ, terme) -> ligne n'est construit qu'à la première recherche
+    def position(self, champ, terme):
+        if self.positions is None:
+            self.positions = {cle: i for i, cle in enumerate(zip(self.termes.column("champ").to_pylist(),
+                                                                  self.termes.column("terme").to_pylist()))}
+        return self.positions.get((champ, terme))
+
+    # Les termes d'un champ (par exemple les thématiques, pour la liste de choix)
+    def termes_champ(self, champ):
+        termes = self.termes.filter(pc.equal(self.termes.column("champ"), champ))
+        return termes.column("terme").to_pylist()
+
+    def liste(self, champ, terme):
+        i = self.position(champ, terme)
+        if i is None:
+            return np.empty(0, dtype=np.uint32)
+        debut = self.termes.column("debut")[i].as_py()
+        taille = self.termes.column("taille")[i].as_py()
+        # read_at ne déplace pas la position du fichier (plusieurs requêtes à la fois)
+        return decompresse(self.postings.read_at(taille, debut))
+
+    # Les mots de la requête que le Tokenizer enlève (stop words, trop courts, avec des
+    # chiffres) : ils ne sont pas dans l'index, la recherche ne les utilise pas
+    def ignores(self, mots):
+        gardes = set(self.tokenizer.tokenize(mots or ""))
+        decoupes = self.tokenizer.separateurs.split((mots or "").lower())
+        return [mot for mot in dict.fromkeys(decoupes) if mot and mot not in gardes]
+
+    # Les numéros des mails contenant tous les mots, de l'expéditeur et de la thématique
+    # demandés (None si aucun critère n'est donné). Si des mots sont donnés mais qu'aucun
+    # n'est gardé par le Tokenizer, aucun mail n'est trouvé.
+    def recherche(self, mots=None, expediteur=None, thematique=None):
+        criteres = [("mot", mot) for mot in dict.fromkeys(self.tokenizer.tokenize(mots or ""))]
+        if mots and mots.strip() and not criteres:
+            return np.empty(0, dtype=np.uint32)
+        if expediteur:
+            criteres.append(("expediteur", expediteur.strip().lower()))
+        if thematique:
+            criteres.append(("thematique", thematique))
+        if not criteres:
+            return None
+        # Les listes les plus courtes d'abord
+        listes = sorted((self.liste(champ, terme) for champ, terme in criteres), key=len)
+        resultat = listes[0]
+        for liste in listes[1:]:
+            if len(resultat) == 0:
+                break
+            resultat = np.intersect1d(resultat, liste, assume_unique=True)
+        return resultat
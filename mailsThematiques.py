@@ -1,69 +1,98 @@
 from pandas import *
-import time
+import pandas
+import os
+import multiprocessing
+from stockage import ecrire_table, lire_table
+from automateThematiques import AutomateThematiques
+from metriques import Metriques, Progression
 
 ## IDMAIL + les thématiques dans un tableau ##
+## Le Message-ID est gardé aussi : idEmail n'est que le numéro de ligne dans le CSV ##
+## brut, il recommence à 0 à chaque export (le Message-ID, lui, identifie le mail). ##
 
-# Récupérer les mots associés à la thématique
-def retrieve_associated_words(stringToChange):
-    wordsAssociated = stringToChange
-    wordsAssociated = wordsAssociated.replace("[", "")
-    wordsAssociated = wordsAssociated.replace("]", "")
-    wordsAssociated = wordsAssociated.replace(",", "")
-    wordsAssociated = wordsAssociated.replace("'", "")
-    wordsAssociated = wordsAssociated.split(" ")
-    return wordsAssociated
-
-# Selon son sujet
-def associate_to_mails():
-    start_time = time.time()
-    df = pandas.read_csv("visualisation/data/formatted_data.csv", low_memory=False, header=0)
-    df = df[['From', 'Subject']].dropna()
-    df1 = pandas.read_csv("visualisation/data/clean_thematiques.csv", low_memory=False, header=0)
+# Les thématiques de chaque mail (seulement s'il en a), selon son sujet
+def etiquette_mails(df, automate):
     # les mails avec leurs thématiques
     mailsThematiques = []
-    nbMail = 0
+    progression = Progression("Mails", total=len(df))
     # Pour chaque mail
-    for mailTraite in df.iterrows():
-        nbMail += 1
-        print(nbMail)
-        mailTraite[1].str.lower()
-        # On crée une nouvelle ligne
-        newMailRow = []
-        # On indique quel mail on traite, on récupère son id
-        idMail = mailTraite[0]
-        From = mailTraite[1].From
-        # Pour chaque thématique existante
-        for rowThemes in df1.iterrows():
-            # La thématique que l'on traite
-            thematique = rowThemes[1].mainThematique
-            # Le sujet dans lequel on veut vérifier la thématique
-            subject = mailTraite[1].Subject
-            # Les mots associés à la thématique
-            wordsAssociated = retrieve_associated_words(rowThemes[1].wordsAssociated)
-            # On regarde si la thématique est présente
-            if(thematique in subject):
-                newMailRow.append(thematique)
-            # Sinon on regarde si un des mots proches est présents
-            else:
-                exist = False
-                # On commence à 1 car le premier mot est la thématique
-                count = 1
-                while not exist and count < len(wordsAssociated):
-                    # Le mot est présent ?
-                    if (wordsAssociated[count] in subject):
-                        # Oui, on indique que le mail est de cette thématique
-                        exist = True
-                        newMailRow.append(thematique)
-                    count += 1
+    for idMail, From, subject in zip(df.index, df['From'], df['Subject']):
+        progression.avance()
+        # Un seul passage sur le sujet pour trouver toutes les thématiques présentes
+        newMailRow = automate.thematiques(subject)
         # Puis on ajoute notre mail avec ses thématiques dans le tableau (seulement s'il en a)
         if newMailRow:
             mailsThematiques.append((idMail, From, newMailRow))
+    return mailsThematiques
+
+
+# L'automate utilisé par les processus de etiquette_mails_parallele : construit une
+# seule fois dans le processus principal, puis hérité en lecture seule via fork
+_automate = None
+
+
+def initialise_processus(automate):
+    global _automate
+    _automate = automate
+
+
+# Le travail d'un processus : un morceau de mails
+def etiquette_morceau(morceau):
+    mailsThematiques = []
+    for idMail, From, subject in zip(*morceau):
+        newMailRow = _automate.thematiques(subject)
+        if newMailRow:
+            mailsThematiques.append((idMail, From, newMailRow))
+    return mailsThematiques
+
+
+# Les mails sont répartis par morceaux sur plusieurs processus, les résultats
+# sont ensuite remis bout à bout dans l'ordre d'origine des mails
+def etiquette_mails_parallele(df, automate, nb_workers, taille_morceau=10000):
+    ids = df.index.tolist()
+    froms = df['From'].tolist()
+    sujets = df['Subject'].tolist()
+    morceaux = [(ids[i:i + taille_morceau], froms[i:i + taille_morceau], sujets[i:i + taille_morceau])
+                for i in range(0, len(ids), taille_morceau)]
+    if "fork" in multiprocessing.get_all_start_methods():
+        initialise_processus(automate)
+        pool = multiprocessing.get_context("fork").Pool(nb_workers)
+    else:
+        # Sans fork (Windows), chaque processus reçoit une copie de l'automate
+        pool = multiprocessing.Pool(nb_workers, initialise_processus, (automate,))
+    with pool:
+        resultats = pool.map(etiquette_morceau, morceaux)
+    mailsThematiques = []
+    for resultat in resultats:
+        mailsThematiques.extend(resultat)
+    return mailsThematiques
+
+
+# Selon son sujet
+def associate_to_mails(moteur=AutomateThematiques, nb_workers=None, taille_morceau=10000):
+    metriques = Metriques("mailsThematiques")
+    if nb_workers is None:
+        nb_workers = os.cpu_count()
+    with metriques.etape("lecture") as etape:
+        df = lire_table("formatted_data", ['Message-ID', 'From', 'Subject']).dropna()
+        df1 = lire_table("clean_thematiques", ["mainThematique", "wordsAssociated"])
+        etape["nb"] = len(df)
+    # Les mots de toutes les thématiques sont compilés une seule fois
+    with metriques.etape("automate", len(df1)):
+        automate = moteur(df1)
+    with metriques.etape("etiquetage", len(df)) as etape:
+        etape["processus"] = nb_workers
+        if nb_workers == 1:
+            mailsThematiques = etiquette_mails(df, automate)
+        else:
+            mailsThematiques = etiquette_mails_parallele(df, automate, nb_workers, taille_morceau)
 
     # On a fini d'attribuer les différentes thématiques aux mails
-    mailsThematiques = pandas.DataFrame(mailsThematiques, columns = ["idEmail","From","Thematiques"])
-    mailsThematiques.to_csv("visualisation/data/mails_thematiques.csv")
-    stop_time = time.time()
-    print("\nTemps de calcul = %f secondes" % (stop_time - start_time))
+    with metriques.etape("ecriture", len(mailsThematiques)):
+        mailsThematiques = pandas.DataFrame(mailsThematiques, columns = ["idEmail","From","Thematiques"])
+        mailsThematiques.insert(1, "Message-ID", df.loc[mailsThematiques["idEmail"], "Message-ID"].to_numpy())
+        ecrire_table(mailsThematiques, "mails_thematiques", dictionnaire=["From"])
+    metriques.ecrit_json()
     print("Nous avons %d mails comportant des thématiques sur %d mails au départ" % (len(mailsThematiques),len(df)))
 
 
@@ -1,19 +1,18 @@
 import pandas as pandas
-import re
+import os
+from collections import Counter
+from multiprocessing import Pool
+from stockage import ecrire_table, lire_table
+from tokenisation import tokenizer_projet
+from metriques import Metriques
 
 
 def split_row(df,col,nameFile):
-    stopwords = open(r"visualisation/data/stopwords.txt")
-    stop = stopwords.readline()
-    stopwords.close()
-    print(stop)
-    #On met tout en minuscule
-    df[col] = df[col].str.lower()
-
-    #Split chaque String de chaque ligne, ce qui va créer des tableaux de string
-    #On supprime les lignes étant des stop words ou étant des nombres
-    df[col] = df[col].str.split("\ |\:|\!|\?|\-|\"|\(|\)|\[|\]|\<|\>|\@|\&|\/|\,|\=|\.|\#|\n|\t|\'")
-    df[col] = df[col].apply(lambda x: [item for item in x if item not in stop and len(item) > 2 and not bool(re.search("[0-9]+", item))])
+    tokenizer = tokenizer_projet()
+    #On met tout en minuscule, puis on split chaque String de chaque ligne,
+    #ce qui va créer des tableaux de string
+    #On supprime les mots étant des stop words ou étant des nombres
+    df[col] = df[col].map(tokenizer.tokens)
 
     #On va l'exploser, donc ajouter pour chaque string dans
     #les listes une nouvelle ligne avec juste un string
@@ -29,15 +28,61 @@ def split_row(df,col,nameFile):
     #On trie par ordre décroissant
     grouped_df = grouped_df.sort_values(by=["count"], ascending=False)
     grouped_df = grouped_df.query('count>=200')
-    grouped_df.to_csv(nameFile)
+    ecrire_table(grouped_df.reset_index(), nameFile)
     print(grouped_df)
 
     #On regarde combien on a de catégories
     print(len(grouped_df))
     print(type(grouped_df))
 
+
+# Map : chaque processus compte les mots de son morceau de sujets
+def compte_mots(morceau):
+    sujets, tokenizer = morceau
+    compte = Counter()
+    for sujet in sujets:
+        compte.update(tokenizer.tokenize(sujet))
+    return compte
+
+
+# Le même MapReduce que split_row, mais réparti sur plusieurs processus :
+# les sujets sont découpés en morceaux, chaque processus renvoie ses comptes
+# partiels (Counter) et on les additionne dans l'étape de reduce.
+def split_row_parallele(df, col, nameFile=None, nb_workers=None, taille_morceau=20000, metriques=None):
+    if metriques is None:
+        metriques = Metriques("map")
+    if nb_workers is None:
+        nb_workers = os.cpu_count()
+    tokenizer = tokenizer_projet()
+    sujets = df[col].tolist()
+    morceaux = [(sujets[i:i + taille_morceau], tokenizer) for i in range(0, len(sujets), taille_morceau)]
+
+    #Map
+    with metriques.etape("map", len(sujets)) as etape:
+        etape["processus"] = nb_workers
+        if nb_workers == 1:
+            partiels = [compte_mots(morceau) for morceau in morceaux]
+        else:
+            with Pool(nb_workers) as pool:
+                partiels = pool.map(compte_mots, morceaux)
+
+    #Reduce
+    with metriques.etape("reduce", len(partiels)):
+        total = Counter()
+        for partiel in partiels:
+            total.update(partiel)
+
+    #Même tableau que split_row : les mots triés par ordre décroissant, au moins 200 fois
+    grouped_df = pandas.DataFrame({"count": total}).rename_axis(col).sort_index()
+    grouped_df = grouped_df.sort_values(by=["count"], ascending=False, kind="stable")
+    grouped_df = grouped_df.query('count>=200')
+    if nameFile is not None:
+        ecrire_table(grouped_df.reset_index(), nameFile)
+    return grouped_df
+
 if __name__ == '__main__':
-    df = pandas.read_csv("visualisation/data/formatted_data.csv", low_memory=False, header=0)
-    df1 = df[['Subject']].dropna()
+    df1 = lire_table("formatted_data", ['Subject']).dropna()
     print(df1)
-    split_row(df1, 'Subject', "visualisation/data/map_reduced_subject.csv")
\ No newline at end of file
+    metriques = Metriques("map")
+    split_row_parallele(df1, 'Subject', "map_reduced_subject", metriques=metriques)
+    metriques.ecrit_json()
@@ -0,0 +1,150 @@
+import numpy as np
+from cacheWordnet import CacheWordnet
+from metriques import Progression
+
+## Regroupement des mots en thématiques à partir d'une matrice de similarité ##
+## Les similarités de Wu-Palmer entre les mots du MapReduce et tous les mots   ##
+## pouvant entrer dans une thématique sont calculées une seule fois dans une    ##
+## matrice NumPy. Le regroupement (seuil de 0.65) se fait ensuite avec des      ##
+## opérations sur cette matrice, avec les deux variantes :                      ##
+##  - "premier" : la première thématique proche (thematique.py)                 ##
+##  - "meilleur" : la thématique la plus proche (thematiques2.py)               ##
+
+SEUIL = 0.65
+
+
+# Les mots ajoutés dans une thématique pour un mot du MapReduce : les synonymes des
+# synsets contenant le mot, et pour chacun s'il s'agit du mot lui-même
+def mots_ajoutes(mot, closeWords):
+    ajouts = []
+    for cws in closeWords:
+        # On regarde si la liste du mot proche contient le mot cible (pour filtrer)
+        if mot in cws.lemma_names():
+            for w in cws.lemma_names():
+                ajouts.append((w, w == mot))
+    return ajouts
+
+
+class MatriceSimilarite:
+    # mots : les mots du MapReduce, dans l'ordre
+    def __init__(self, mots, cache=None):
+        if cache is None:
+            cache = CacheWordnet()
+        self.cache = cache
+        self.mots = list(mots)
+        self.lemmes = [cache.lemme(motBrut) for motBrut in self.mots]
+        self.closeWords = [cache.synsets(mot) for mot in self.lemmes]
+
+        # Les synsets dont on a besoin : d'abord le premier synset de chaque mot du
+        # MapReduce (les lignes), puis le premier synset de chaque mot pouvant entrer
+        # dans une thématique
+        self.synsets = []
+        self.numeroSynset = {}
+        for closeWords in self.closeWords:
+            if len(closeWords) != 0:
+                self.ajoute_synset(closeWords[0])
+        self.nbLignes = len(self.synsets)
+        # Pour chaque mot pouvant entrer dans une thématique, le numéro de son premier synset
+        self.colonneMot = {}
+        for mot, closeWords in zip(self.lemmes, self.closeWords):
+            ajouts = mots_ajoutes(mot, closeWords) or [(mot, True)]
+            for w, estMot in ajouts:
+                if w not in self.colonneMot:
+                    synset = cache.premier_synset(w)
+                    self.colonneMot[w] = None if synset is None else self.ajoute_synset(synset)
+
+        # Les similarités : lignes x tous les synsets, chaque paire n'est calculée qu'une
+        # fois (le bloc lignes x lignes est symétrique)
+        self.matrice = np.zeros((self.nbLignes, len(self.synsets)), dtype=np.float32)
+        progression = Progression("Similarités", total=self.nbLignes, pas=50)
+        for i in range(self.nbLignes):
+            progression.avance()
+            for j in range(i, len(self.synsets)):
+                similarity = cache.similarite(self.synsets[i], self.synsets[j])
+                self.matrice[i, j] = similarity
+                if j < self.nbLignes:
+                    self.matrice[j, i] = similarity
+
+    def ajoute_synset(self, synset):
+        numero = self.numeroSynset.get(synset.name())
+        if numero is None:
+            numero = len(self.synsets)
+            self.numeroSynset[synset.name()] = numero
+            self.synsets.append(synset)
+        return numero
+
+    # La ligne de la matrice pour un mot du MapReduce (None s'il n'est pas dans wordnet)
+    def ligne(self, i):
+        if len(self.closeWords[i]) == 0:
+            return None
+        return self.numeroSynset[self.closeWords[i][0].name()]
+
+
+# Le même regroupement que create_thematiques (thematique.py ou thematiques2.py)
+def create_thematiques(col, df, variante="premier", cache=None, matrice=None):
+    if variante not in ("premier", "meilleur"):
+        raise ValueError("variante inconnue : %s" % variante)
+    if matrice is None:
+        matrice = MatriceSimilarite(df[col], cache)
+    nbMots = len(matrice.mots)
+    nbSynsets = len(matrice.synsets)
+    # Les thématiques avec seulement les mots apparaissant de bases en mots associés
+    realThematiques = []
+    # Pour chaque mot, les thématiques qui le contiennent
+    thematiquesMot = {}
+    # Pour chaque thématique, les synsets de ses mots, sur les colonnes utilisées
+    # (une thématique par mot au maximum)
+    colonnes = np.full(nbSynsets, -1)
+    utilisees = []
+    membres = np.zeros((nbMots, 0), dtype=bool)
+
+    for i in range(nbMots):
+        motBrut = matrice.mots[i]
+        mot = matrice.lemmes[i]
+        nbThemes = len(realThematiques)
+        # On regarde si on a déjà eu ce mot dans les thématiques précédentes
+        contient = np.zeros(nbThemes, dtype=bool)
+        contient[list(thematiquesMot.get(mot, ()))] = True
+        ligne = matrice.ligne(i)
+        if ligne is not None and len(utilisees) > 0:
+            # Similarités avec les mots de chaque thématique (0 en dessous du seuil)
+            similarites = matrice.matrice[ligne, utilisees]
+            similarites = np.where(similarites >= SEUIL, similarites, 0)
+            meilleures = (membres[:nbThemes, :len(utilisees)] * similarites).max(axis=1)
+        else:
+            meilleures = np.zeros(nbThemes)
+
+        if variante == "premier":
+            trouvees = np.flatnonzero(contient | (meilleures > 0))
+            placementMot = trouvees[0] if len(trouvees) > 0 else None
+        else:
+            # Une thématique contenant le mot prend la place, sinon il faut battre
+            # la meilleure similarité des thématiques précédentes
+            meilleures = np.where(contient, 0, meilleures)
+            precedentes = np.maximum.accumulate(np.concatenate(([0], meilleures[:-1])))
+            trouvees = np.flatnonzero(contient | (meilleures > precedentes))
+            placementMot = trouvees[-1] if len(trouvees) > 0 else None
+
+        ajouts = mots_ajoutes(mot, matrice.closeWords[i])
+        if placementMot is None:
+            # Nouvelle thématique (mot inconnu : seulement le mot lui-même)
+            placementMot = nbThemes
+            realThematiques.append([])
+            if len(ajouts) == 0:
+                ajouts = [(mot, True)]
+        # On ajoute chacun des mots dans la bonne case de thématiques
+        for w, estMot in ajouts:
+            thematiquesMot.setdefault(w, set()).add(placementMot)
+            colonne = matrice.colonneMot.get(w)
+            if colonne is not None:
+                if colonnes[colonne] < 0:
+                    colonnes[colonne] = len(utilisees)
+                    utilisees.append(colonne)
+                    if len(utilisees) > membres.shape[1]:
+                        # On double la place réservée pour les colonnes
+                        membres = np.hstack((membres, np.zeros((nbMots, max(membres.shape[1], 64)), dtype=bool)))
+                membres[placementMot, colonnes[colonne]] = True
+            if estMot:
+                realThematiques[placementMot].append(motBrut)
+    print("Nous passons de %d à %d thématiques " % (nbMots, len(realThematiques)))
+    return realThematiques
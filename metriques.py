@@ -0,0 +1,85 @@
+import os
+import json
+import time
+from contextlib import contextmanager
+from stockage import DOSSIER
+
+## Suivi de l'avancement et mesures des étapes du projet ##
+## Remplace les print à chaque élément et les time.time() dispersés dans les scripts. ##
+
+
+# Affichage par défaut de l'avancement
+def affiche_progression(nom, nb, total, duree):
+    vitesse = nb / duree if duree > 0 else 0
+    if total:
+        print("%s : %d/%d (%.0f%%, %.0f/s)" % (nom, nb, total, 100 * nb / total, vitesse))
+    else:
+        print("%s : %d (%.0f/s)" % (nom, nb, vitesse))
+
+
+class Progression:
+    # Le rappel est appelé tous les `pas` éléments, ou toutes les `intervalle` secondes
+    def __init__(self, nom="", total=None, pas=10000, intervalle=10.0, rappel=affiche_progression):
+        self.nom = nom
+        self.total = total
+        self.pas = pas
+        self.intervalle = intervalle
+        self.rappel = rappel
+        self.nb = 0
+        self.debut = time.monotonic()
+        self.prochain = pas
+        self.prochaineHeure = self.debut + intervalle if intervalle else None
+
+    def avance(self, n=1):
+        self.nb += n
+        if self.nb >= self.prochain:
+            self.signale()
+        elif self.prochaineHeure is not None and time.monotonic() >= self.prochaineHeure:
+            self.signale()
+
+    def signale(self):
+        maintenant = time.monotonic()
+        self.prochain = self.nb + self.pas
+        if self.intervalle:
+            self.prochaineHeure = maintenant + self.intervalle
+        if self.rappel is not None:
+            self.rappel(self.nom, self.nb, self.total, maintenant - self.debut)
+
+
+class Metriques:
+    # Pour chaque étape : sa durée et le nombre d'éléments traités
+    def __init__(self, nom):
+        self.nom = nom
+        self.debut = time.time()
+        self.etapes = []
+
+    @contextmanager
+    def etape(self, nom, nb=None):
+        mesure = {"etape": nom, "nb": nb}
+        debut = time.perf_counter()
+        try:
+            yield mesure
+        finally:
+            mesure["duree"] = time.perf_counter() - debut
+            if mesure["nb"] is not None and mesure["duree"] > 0:
+                mesure["parSeconde"] = mesure["nb"] / mesure["duree"]
+            self.etapes.append(mesure)
+            if "parSeconde" in mesure:
+                print("\nTemps de calcul = %f secondes (%s, %.0f/s)" % (mesure["duree"], nom, mesure["parSeconde"]))
+            else:
+                print("\nTemps de calcul = %f secondes (%s)" % (mesure["duree"], nom))
+
+    def resume(self):
+        return {
+            "script": self.nom,
+            "debut": self.debut,
+            "duree": sum(mesure["duree"] for mesure in self.etapes),
+            "etapes": self.etapes,
+        }
+
+    # Par défaut à côté des données : visualisation/data/metriques_<script>.json
+    def ecrit_json(self, fichier=None):
+        if fichier is None:
+            fichier = os.path.join(DOSSIER, "metriques_%s.json" % self.nom)
+        with open(fichier, "w") as sortie:
+            json.dump(self.resume(), sortie, indent=2, ensure_ascii=False)
@@ -0,0 +1,118 @@
+import os
+import pickle
+import hashlib
+import numpy as np
+from minageItemsets import ArbreFP
+
+## Mise à jour des itemsets fréquents quand de nouveaux mails arrivent ##
+## L'arbre FP de tous les mails déjà vus est gardé sur disque. Un lot de nouveaux   ##
+## mails y est inséré, puis on cherche les itemsets dans l'arbre : les anciens mails ##
+## ne sont pas relus. Les items gardent l'ordre fixé à la dernière compaction (les   ##
+## nouveaux items à la fin) ; la compaction reconstruit l'arbre dans l'ordre des      ##
+## fréquences actuelles pour qu'il reste compact. Une empreinte de 8 octets du       ##
+## Message-ID de chaque mail inséré est gardée (tableau NumPy trié) : un mail déjà vu ##
+## n'est pas compté une deuxième fois.                                                ##
+
+FICHIER_MINEUR = "visualisation/data/minage_incremental.pkl"
+
+
+class MineurIncremental:
+    # compaction : nombre de lots entre deux reconstructions de l'arbre
+    def __init__(self, compaction=10):
+        self.compaction = compaction
+        self.noms = []
+        self.numeros = {}
+        # Le rang de chaque item dans l'ordre d'insertion
+        self.rangs = {}
+        # Arbre vide, qui garde tous les items (seuil de 1)
+        self.arbre = ArbreFP([], 1, exact=True)
+        self.nbTransactions = 0
+        self.lotsDepuisCompaction = 0
+        # Les empreintes des Message-ID déjà insérés, triées
+        self.mailsVus = np.empty(0, dtype=np.uint64)
+
+    def numero(self, item):
+        numero = self.numeros.get(item)
+        if numero is None:
+            numero = len(self.noms)
+            self.numeros[item] = numero
+            self.noms.append(item)
+            self.rangs[numero] = len(self.rangs)
+            self.arbre.frequents[numero] = 0
+            self.arbre.entetes[numero] = []
+        return numero
+
+    # Un lot de transactions (les thématiques des nouveaux mails) et les Message-ID de
+    # ces mails ; les mails déjà insérés sont ignorés. Rend le nombre de mails ajoutés.
+    def ajoute(self, transactions, ids):
+        empreintes = np.fromiter((empreinte(idMail) for idMail in ids), dtype=np.uint64)
+        # Le premier de chaque Message-ID du lot, s'il n'a pas déjà été inséré
+        uniques, premiers = np.unique(empreintes, return_index=True)
+        nouveaux = np.isin(uniques, self.mailsVus, assume_unique=True, invert=True)
+        gardes = np.zeros(len(empreintes), dtype=bool)
+        gardes[premiers[nouveaux]] = True
+        self.mailsVus = np.union1d(self.mailsVus, uniques[nouveaux])
+        poids = {}
+        nbAjoutes = int(gardes.sum())
+        for transaction, garde in zip(transactions, gardes):
+            if not garde:
+                continue
+            items = sorted({self.numero(item) for item in transaction}, key=self.rangs.__getitem__)
+            cle = tuple(items)
+            poids[cle] = poids.get(cle, 0) + 1
+            self.nbTransactions += 1
+        for items, nb in poids.items():
+            for item in items:
+                self.arbre.frequents[item] += nb
+            self.arbre.insere(items, nb)
+        self.lotsDepuisCompaction += 1
+        if self.lotsDepuisCompaction >= self.compaction:
+            self.compacte()
+        return nbAjoutes
+
+    # Chaque noeud est la fin de (compte - comptes de ses enfants) transactions :
+    # on réinsère ces chemins dans un arbre trié par fréquences
+    def compacte(self):
+        arbre = self.arbre
+        transactions = []
+        for noeud in range(1, len(arbre.valeurs)):
+            fin = arbre.comptes[noeud] - sum(arbre.comptes[enfant] for enfant in arbre.enfants[noeud].values())
+            if fin > 0:
+                chemin = []
+                parent = noeud
+                while parent != 0:
+                    chemin.append(arbre.valeurs[parent])
+                    parent = arbre.parents[parent]
+                transactions.append((chemin, fin))
+        ordre = sorted(arbre.frequents, key=lambda item: (-arbre.frequents[item], item))
+        self.rangs = {item: rang for rang, item in enumerate(ordre)}
+        nouvelArbre = ArbreFP([], 1, exact=True)
+        nouvelArbre.frequents = {item: arbre.frequents[item] for item in ordre}
+        nouvelArbre.entetes = {item: [] for item in ordre}
+        for chemin, fin in transactions:
+            nouvelArbre.insere(sorted(chemin, key=self.rangs.__getitem__), fin)
+        self.arbre = nouvelArbre
+        self.lotsDepuisCompaction = 0
+
+    # Les itemsets fréquents, au même format que minageItemsets.itemsets_frequents
+    def motifs(self, seuil):
+        motifs = self.arbre.motifs_exacts(seuil)
+        return {tuple(sorted(self.noms[item] for item in motif)): nb for motif, nb in motifs.items()}
+
+    def sauvegarde(self, fichier=FICHIER_MINEUR):
+        with open(fichier, "wb") as sortie:
+            pickle.dump(self, sortie)
+
+
+# L'empreinte d'un Message-ID : 8 octets de blake2b (une collision est très improbable
+# pour quelques millions de mails)
+def empreinte(idMail):
+    return int.from_bytes(hashlib.blake2b(str(idMail).encode(), digest_size=8).digest(), "little")
+
+
+# Le mineur gardé sur disque (None s'il n'existe pas encore)
+def charge_mineur(fichier=FICHIER_MINEUR):
+    if not os.path.exists(fichier):
+        return None
+    with open(fichier, "rb") as entree:
+        return pickle.load(entree)
@@ -0,0 +1,247 @@
+import itertools
+import numpy as np
+
+## Recherche des itemsets fréquents et des règles d'association ##
+## Remplace pyfpgrowth : les items sont numérotés, les chemins des arbres            ##
+## conditionnels sont insérés une fois avec leur compte (et non recopiés), et l'arbre ##
+## FP est rangé dans des listes (une case par noeud) avec pour chaque item la liste   ##
+## de ses noeuds. Trois modes :                                                        ##
+##  - "compatible" : exactement les résultats de pyfpgrowth (mêmes motifs, mêmes      ##
+##    comptes, même ordre), y compris ses approximations                              ##
+##  - "exact" : FP-growth avec un ordre total sur les items                            ##
+##  - "eclat" : recherche verticale, un tableau de bits NumPy par item                 ##
+
+MODES = ("compatible", "exact", "eclat")
+
+# Nombre de bits à 1 pour chaque octet
+BITS_OCTET = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+
+# Les items sont numérotés dans l'ordre alphabétique : trier les numéros revient
+# à trier les noms
+def numerote(transactions):
+    noms = sorted({item for transaction in transactions for item in transaction})
+    return noms, {nom: i for i, nom in enumerate(noms)}
+
+
+# Les transactions avec les numéros des items, sans en faire de copie : l'arbre
+# les parcourt deux fois (comptes des items, puis insertion), chacune avec un poids de 1
+class TransactionsNumerotees:
+    def __init__(self, transactions, numeros):
+        self.transactions = transactions
+        self.numeros = numeros
+
+    def __iter__(self):
+        numeros = self.numeros
+        for transaction in self.transactions:
+            yield [numeros[item] for item in transaction], 1
+
+
+class ArbreFP:
+    __slots__ = ("valeur", "compte", "exact", "frequents", "valeurs", "comptes", "parents", "enfants", "entetes")
+
+    # transactions : des couples (items, poids). valeur et compte : l'item et son compte
+    # à la racine d'un arbre conditionnel (None pour l'arbre principal)
+    def __init__(self, transactions, seuil, valeur=None, compte=None, exact=False):
+        self.valeur = valeur
+        self.compte = compte
+        self.exact = exact
+        # Les items assez fréquents, dans l'ordre de première apparition
+        frequents = {}
+        for items, poids in transactions:
+            for item in items:
+                frequents[item] = frequents.get(item, 0) + poids
+        self.frequents = {item: nb for item, nb in frequents.items() if nb >= seuil}
+
+        # Les noeuds : la racine est le noeud 0
+        self.valeurs = [valeur]
+        self.comptes = [compte]
+        self.parents = [-1]
+        self.enfants = [{}]
+        self.entetes = {item: [] for item in self.frequents}
+        for items, poids in transactions:
+            self.insere(self.trie(items), poids)
+
+    # Les items de la transaction du plus fréquent au moins fréquent. pyfpgrowth garde
+    # l'ordre de la transaction en cas d'égalité, le mode exact départage par numéro.
+    def trie(self, items):
+        frequents = self.frequents
+        tries = [item for item in items if item in frequents]
+        if self.exact:
+            tries.sort(key=lambda item: (-frequents[item], item))
+        else:
+            tries.sort(key=frequents.__getitem__, reverse=True)
+        return tries
+
+    def insere(self, items, poids):
+        noeud = 0
+        for item in items:
+            enfant = self.enfants[noeud].get(item)
+            if enfant is None:
+                enfant = len(self.valeurs)
+                self.valeurs.append(item)
+                self.comptes.append(poids)
+                self.parents.append(noeud)
+                self.enfants.append({})
+                self.enfants[noeud][item] = enfant
+                self.entetes[item].append(enfant)
+            else:
+                self.comptes[enfant] += poids
+            noeud = enfant
+
+    def chemin_unique(self):
+        return all(len(enfants) <= 1 for enfants in self.enfants)
+
+    # Les chemins menant aux noeuds de l'item (sans l'item ni la racine), avec leur compte
+    def chemins(self, item):
+        valeurs = self.valeurs
+        parents = self.parents
+        conditionnelles = []
+        for noeud in self.entetes[item]:
+            chemin = []
+            parent = parents[noeud]
+            while parent != 0:
+                chemin.append(valeurs[parent])
+                parent = parents[parent]
+            conditionnelles.append((chemin, self.comptes[noeud]))
+        return conditionnelles
+
+    # Même parcours que pyfpgrowth (FPTree.mine_patterns)
+    def motifs_compatibles(self, seuil):
+        if self.chemin_unique():
+            return self.liste_motifs()
+        motifs = {}
+        for item in sorted(self.frequents, key=self.frequents.__getitem__):
+            sousArbre = ArbreFP(self.chemins(item), seuil, item, self.frequents[item])
+            for motif, nb in sousArbre.motifs_compatibles(seuil).items():
+                motifs[motif] = motifs.get(motif, 0) + nb
+        if self.valeur is None:
+            return motifs
+        return {tuple(sorted(motif + (self.valeur,))): nb for motif, nb in motifs.items()}
+
+    # Sur un seul chemin, toutes les combinaisons des items
+    def liste_motifs(self):
+        motifs = {}
+        items = list(self.frequents)
+        if self.valeur is None:
+            suffixe = ()
+        else:
+            suffixe = (self.valeur,)
+            motifs[suffixe] = self.compte
+        for i in range(1, len(items) + 1):
+            for combinaison in itertools.combinations(items, i):
+                motifs[tuple(sorted(combinaison + suffixe))] = min(self.frequents[x] for x in combinaison)
+        return motifs
+
+    # FP-growth classique : chaque item fréquent complète le suffixe, puis on cherche
+    # dans l'arbre conditionnel de l'item
+    def motifs_exacts(self, seuil, suffixe=(), motifs=None):
+        if motifs is None:
+            motifs = {}
+        for item, nb in self.frequents.items():
+            # Un arbre gardé entre deux recherches contient aussi les items peu fréquents
+            if nb < seuil:
+                continue
+            motif = suffixe + (item,)
+            motifs[tuple(sorted(motif))] = nb
+            sousArbre = ArbreFP(self.chemins(item), seuil, item, nb, exact=True)
+            if len(sousArbre.frequents) > 0:
+                sousArbre.motifs_exacts(seuil, motif, motifs)
+        return motifs
+
+
+# Recherche verticale : pour chaque item, un bit par transaction ; le compte d'un
+# itemset est le nombre de bits à 1 du ET de ses items
+def eclat(transactions, numeros, seuil):
+    longueurs = np.fromiter(map(len, transactions), dtype=np.int64, count=len(transactions))
+    lignes = np.fromiter((numeros[item] for transaction in transactions for item in transaction),
+                         dtype=np.int64, count=longueurs.sum())
+    colonnes = np.repeat(np.arange(len(transactions)), longueurs)
+    # Même rangement que np.packbits : la transaction j est le bit 7 - j % 8 de l'octet j // 8
+    bits = np.zeros((len(numeros), (len(transactions) + 7) // 8), dtype=np.uint8)
+    np.bitwise_or.at(bits, (lignes, colonnes >> 3), (128 >> (colonnes & 7)).astype(np.uint8))
+    comptes = BITS_OCTET[bits].sum(axis=1)
+    candidats = [(item, bits[item], comptes[item]) for item in range(len(numeros)) if comptes[item] >= seuil]
+    motifs = {}
+    etend((), candidats, seuil, motifs)
+    return motifs
+
+
+def etend(prefixe, candidats, seuil, motifs):
+    for i, (item, bitsItem, nb) in enumerate(candidats):
+        motif = prefixe + (item,)
+        motifs[motif] = int(nb)
+        suivants = []
+        for autre, bitsAutre, nbAutre in candidats[i + 1:]:
+            communs = bitsItem & bitsAutre
+            nbCommuns = BITS_OCTET[communs].sum()
+            if nbCommuns >= seuil:
+                suivants.append((autre, communs, nbCommuns))
+        if suivants:
+            etend(motif, suivants, seuil, motifs)
+
+
+# Les itemsets fréquents : {tuple trié des items : nombre de transactions}
+def itemsets_frequents(transactions, seuil, mode="compatible"):
+    if mode not in MODES:
+        raise ValueError("mode inconnu : %s" % mode)
+    noms, numeros = numerote(transactions)
+    if mode == "eclat":
+        motifs = eclat(transactions, numeros, seuil)
+    elif mode == "exact":
+        motifs = ArbreFP(TransactionsNumerotees(transactions, numeros), seuil, exact=True).motifs_exacts(seuil)
+    else:
+        motifs = ArbreFP(TransactionsNumerotees(transactions, numeros), seuil).motifs_compatibles(seuil)
+    return {tuple(noms[item] for item in motif): nb for motif, nb in motifs.items()}
+
+
+# Les règles A -> B de confiance suffisante : {A : (B, confiance)}. Comme pyfpgrowth,
+# on ne garde qu'une règle par antécédent (la dernière trouvée).
+def regles_association(motifs, seuil_confiance):
+    regles = {}
+    for itemset, nbItemset in motifs.items():
+        for i in range(1, len(itemset)):
+            for antecedent in itertools.combinations(itemset, i):
+                antecedent = tuple(sorted(antecedent))
+                if antecedent in motifs:
+                    confiance = float(nbItemset) / motifs[antecedent]
+                    if confiance >= seuil_confiance:
+                        consequent = tuple(sorted(set(itemset) - set(antecedent)))
+                        regles[antecedent] = (consequent, confiance)
+    return regles
+
+
+# Pour chaque motif ayant des sur-ensembles stricts parmi les motifs : le plus petit et
+# le plus grand compte de ces sur-ensembles. Chaque motif énumère ses sous-ensembles
+# (peu nombreux : un mail a peu de thématiques) et les cherche dans le dictionnaire,
+# au lieu de comparer toutes les paires de motifs.
+def comptes_sur_ensembles(motifs):
+    comptes = {}
+    for motif, nb in motifs.items():
+        for taille in range(1, len(motif)):
+            for sousMotif in itertools.combinations(motif, taille):
+                if sousMotif in motifs:
+                    extremes = comptes.get(sousMotif)
+                    if extremes is None:
+                        comptes[sousMotif] = (nb, nb)
+                    else:
+                        comptes[sousMotif] = (min(extremes[0], nb), max(extremes[1], nb))
+    return comptes
+
+
+# Les motifs gardés, dans le même ordre :
+#  - "fermes" : aucun sur-ensemble n'a le même compte
+#  - "maximaux" : aucun sur-ensemble n'est fréquent
+#  - "ratio" : on enlève un motif si tous ses sur-ensembles ont au moins `ratio` fois
+#    son compte (le petit ensemble n'apporte rien de plus)
+def filtre_motifs(motifs, filtre="ratio", ratio=0.5):
+    comptes = comptes_sur_ensembles(motifs)
+    if filtre == "fermes":
+        garder = lambda motif, nb: motif not in comptes or comptes[motif][1] < nb
+    elif filtre == "maximaux":
+        garder = lambda motif, nb: motif not in comptes
+    elif filtre == "ratio":
+        garder = lambda motif, nb: motif not in comptes or comptes[motif][0] / nb < ratio
+    else:
+        raise ValueError("filtre inconnu : %s" % filtre)
+    return {motif: nb for motif, nb in motifs.items() if garder(motif, nb)}
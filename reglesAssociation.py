@@ -0,0 +1,53 @@
+import numpy as np
+import pandas
+
+## Calcul des mesures des règles d'association A -> B ##
+## Les comptes de A, de B et de A u B sont rangés dans des tableaux NumPy, et toutes  ##
+## les mesures sont calculées en une fois sur ces tableaux :                          ##
+##  - support : part des transactions contenant A et B                                ##
+##  - confiance : P(B | A)                                                            ##
+##  - lift : confiance / support de B                                                 ##
+##  - levier : support - support de A x support de B                                  ##
+##  - conviction : (1 - support de B) / (1 - confiance), infinie si la confiance vaut 1 ##
+
+METRIQUES = ("support", "confiance", "lift", "levier", "conviction")
+
+
+# Les mesures des règles [(A, B)] : les motifs doivent contenir les comptes de A, de B
+# (singletons compris) et de A u B. Un compte manquant donne des mesures NaN.
+def mesures_regles(regles, motifs, nbTransactions):
+    comptesA = np.array([motifs.get(tuple(sorted(A)), np.nan) for A, B in regles], dtype=float)
+    comptesB = np.array([motifs.get(tuple(sorted(B)), np.nan) for A, B in regles], dtype=float)
+    comptesAB = np.array([motifs.get(tuple(sorted(set(A) | set(B))), np.nan) for A, B in regles], dtype=float)
+    supportA = comptesA / nbTransactions
+    supportB = comptesB / nbTransactions
+    support = comptesAB / nbTransactions
+    confiance = comptesAB / comptesA
+    with np.errstate(divide="ignore", invalid="ignore"):
+        conviction = np.where(confiance < 1, (1 - supportB) / (1 - confiance), np.inf)
+    conviction[np.isnan(confiance) | np.isnan(supportB)] = np.nan
+    return pandas.DataFrame({
+        "A": [list(A) for A, B in regles],
+        "B": [list(B) for A, B in regles],
+        "supportA": supportA,
+        "supportB": supportB,
+        "support": support,
+        "confiance": confiance,
+        "lift": confiance / supportB,
+        "levier": support - supportA * supportB,
+        "conviction": conviction,
+    })
+
+
+# Les k meilleures règles selon une mesure (les NaN en dernier), de la meilleure à la
+# moins bonne. argpartition évite de trier toutes les règles.
+def meilleures_regles(rules_df, metrique="lift", k=None):
+    if metrique not in METRIQUES:
+        raise ValueError("mesure inconnue : %s" % metrique)
+    valeurs = np.nan_to_num(rules_df[metrique].to_numpy(dtype=float), nan=-np.inf, posinf=np.finfo(float).max)
+    if k is not None and k < len(valeurs):
+        lignes = np.argpartition(-valeurs, k)[:k]
+    else:
+        lignes = np.arange(len(valeurs))
+    lignes = lignes[np.argsort(-valeurs[lignes], kind="stable")]
+    return rules_df.iloc[lignes]
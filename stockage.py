@@ -0,0 +1,96 @@
+import os
+import ast
+import pandas
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+## Stockage des tables intermédiaires du projet au format Parquet ##
+## Les colonnes contenant des listes (thématiques, mots associés) sont de vraies  ##
+## listes, et les noms d'expéditeurs sont encodés en dictionnaire.                ##
+
+DOSSIER = "visualisation/data"
+
+
+# Le chemin du fichier d'une table
+def chemin(nom):
+    return os.path.join(DOSSIER, nom + ".parquet")
+
+
+# Les colonnes dont les valeurs sont des dictionnaires
+def colonnes_dictionnaires(df):
+    dicos = []
+    for col in df.columns:
+        valeurs = df[col].dropna()
+        if df[col].dtype == object and len(valeurs) > 0 and isinstance(valeurs.iloc[0], dict):
+            dicos.append(col)
+    return dicos
+
+
+# Les colonnes contenant des dictionnaires sont stockées en map<string, int64>
+def vers_arrow(df, dictionnaire=(), index=False):
+    df = df.copy()
+    dicos = colonnes_dictionnaires(df)
+    for col in dictionnaire:
+        df[col] = df[col].astype("category")
+    valeurs = {col: df.pop(col) for col in dicos}
+    table = pa.Table.from_pandas(df, preserve_index=index)
+    for col, serie in valeurs.items():
+        colonne = pa.array([None if d is None else list(d.items()) for d in serie],
+                           type=pa.map_(pa.string(), pa.int64()))
+        table = table.append_column(col, colonne)
+    return table
+
+
+def ecrire_table(df, nom, dictionnaire=(), index=False):
+    pq.write_table(vers_arrow(df, dictionnaire, index), chemin(nom))
+
+
+# On ne lit que les colonnes demandées
+def lire_table(nom, colonnes=None):
+    table = pq.read_table(chemin(nom), columns=colonnes, use_pandas_metadata=True)
+    # On récupère les listes et les dictionnaires comme des objets python
+    listes = {}
+    for i, champ in enumerate(table.schema):
+        if pa.types.is_map(champ.type):
+            listes[champ.name] = [None if d is None else dict(d) for d in table.column(i).to_pylist()]
+        elif pa.types.is_list(champ.type) or pa.types.is_large_list(champ.type):
+            listes[champ.name] = table.column(i).to_pylist()
+    df = table.drop(list(listes)).to_pandas()
+    for col, valeurs in listes.items():
+        df[col] = valeurs
+    # On remet les colonnes dans l'ordre du fichier
+    return df[[col for col in table.column_names if col in df.columns]]
+
+
+# Le nombre de lignes d'une table, sans la lire
+def nombre_lignes(nom):
+    return pq.ParquetFile(chemin(nom)).metadata.num_rows
+
+
+# Pour reprendre les anciens fichiers CSV (listes et dictionnaires écrits en texte)
+def convertit_csv(nom, objets=(), dictionnaire=(), index=None):
+    df = pandas.read_csv(os.path.join(DOSSIER, nom + ".csv"), low_memory=False, header=0)
+    for col in objets:
+        df[col] = [ast.literal_eval(valeur) if isinstance(valeur, str) else valeur for valeur in df[col]]
+        df[col] = [list(valeur) if isinstance(valeur, tuple) else valeur for valeur in df[col]]
+    if index is not None:
+        df = df.rename(columns={"Unnamed: 0": index}).set_index(index)
+    else:
+        df = df.drop(columns=["Unnamed: 0"], errors="ignore")
+    ecrire_table(df, nom, dictionnaire, index is not None)
+    return df
+
+
+if __name__ == '__main__':
+    # Conversion des fichiers CSV existants
+    convertit_csv("formatted_data", index="idEmail")
+    convertit_csv("map_reduced_subject")
+    convertit_csv("clean_thematiques", objets=["wordsAssociated"])
+    convertit_csv("clean_thematiques2", objets=["wordsAssociated"])
+    convertit_csv("mails_thematiques", objets=["Thematiques"], dictionnaire=["From"])
+    convertit_csv("exp_mails", objets=["Dictionnaire des thématiques"], dictionnaire=["From"])
+    convertit_csv("itemsetsFrequents", objets=["Thématiques souvent associées"])
+    convertit_csv("itemsetsFrequents2", objets=["Thématiques souvent associées"])
+    convertit_csv("reglesEtCalculs", objets=["A", "B"])
+    convertit_csv("extracted_data", index="From")
+    convertit_csv("extracted_data2", index="From")
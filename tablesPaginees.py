@@ -0,0 +1,120 @@
+import math
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from cache import LRU
+
+## Pagination, tri et filtre des DataTable faits côté serveur ##
+## Le navigateur ne reçoit que la page affichée. Les ordres de tri de chaque colonne ##
+## sont calculés une fois puis gardés ; les filtres récents sont gardés dans un LRU.  ##
+## Les filtres suivent la syntaxe de filter_query de Dash : {colonne} op valeur, les   ##
+## conditions étant séparées par " && ". Un filtre non compris lève une ValueError     ##
+## (il n'est jamais ignoré, pour ne pas montrer une table non filtrée).               ##
+
+OPERATEURS = [('ge ', '>='), ('le ', '<='), ('lt ', '<'), ('gt ', '>'), ('ne ', '!='), ('eq ', '='),
+              ('contains ',), ('datestartswith ',)]
+
+COMPARAISONS = {'ge': pc.greater_equal, 'le': pc.less_equal, 'lt': pc.less, 'gt': pc.greater,
+                'ne': pc.not_equal, 'eq': pc.equal}
+
+
+# Une condition "{colonne} op valeur" : (colonne, op, valeur, casse), None si elle n'est pas
+# comprise. La valeur reste le texte tapé (sans les guillemets) : la colonne décide si c'est
+# un nombre. casse : 'i' ou 's' si l'opérateur a le préfixe de Dash (icontains, s=, ...)
+def decoupe_condition(condition):
+    debut, fin = condition.find('{'), condition.find('}')
+    if debut < 0 or fin < debut:
+        return None
+    nom = condition[debut + 1: fin]
+    reste = condition[fin + 1:].strip() + ' '
+    casse = None
+    if reste[:1] in ('i', 's') and any(reste[1:].startswith(op) for ops in OPERATEURS for op in ops):
+        casse, reste = reste[0], reste[1:]
+    for operateurs in OPERATEURS:
+        for operateur in operateurs:
+            if reste.startswith(operateur):
+                valeur = reste[len(operateur):].strip()
+                if len(valeur) >= 2 and valeur[0] == valeur[-1] and valeur[0] in ("'", '"', '`'):
+                    valeur = valeur[1:-1].replace('\\' + valeur[0], valeur[0])
+                return nom, operateurs[0].strip(), valeur, casse
+    return None
+
+
+class TablePaginee:
+    # table : une table Arrow (par exemple celle du paquet d'artefacts, mappée en mémoire)
+    def __init__(self, table, filtres=64):
+        self.table = table
+        self.ordres = {}
+        self.masques = LRU(filtres)
+
+    def __len__(self):
+        return self.table.num_rows
+
+    # Les numéros des lignes triées selon une colonne (les valeurs vides à la fin)
+    def ordre(self, colonne, sens):
+        cle = (colonne, sens)
+        if cle not in self.ordres:
+            self.ordres[cle] = pc.sort_indices(self.table, sort_keys=[(colonne, sens)],
+                                               null_placement="at_end").to_numpy()
+        return self.ordres[cle]
+
+    # Sur le texte, contains ignore la casse par défaut, les comparaisons la respectent
+    def condition(self, colonne, operateur, valeur, casse=None):
+        donnees = self.table.column(colonne)
+        numerique = pa.types.is_integer(donnees.type) or pa.types.is_floating(donnees.type)
+        if numerique and operateur != 'datestartswith':
+            try:
+                nombre = float(valeur)
+            except ValueError:
+                raise ValueError("Filtre non compris : la colonne %s attend un nombre, pas « %s »" % (colonne, valeur))
+            if operateur == 'contains':
+                return pc.equal(donnees, nombre)
+            return COMPARAISONS[operateur](donnees, nombre)
+        # Les autres colonnes sont comparées comme du texte, avec la valeur telle que tapée
+        donnees = pc.cast(donnees, pa.string())
+        if operateur == 'contains':
+            return pc.match_substring(donnees, valeur, ignore_case=casse != 's')
+        if casse == 'i':
+            donnees = pc.utf8_lower(donnees)
+            valeur = valeur.lower()
+        if operateur == 'datestartswith':
+            return pc.starts_with(donnees, valeur)
+        return COMPARAISONS[operateur](donnees, valeur)
+
+    # Le masque des lignes gardées par le filtre (None si pas de filtre)
+    def masque(self, requete):
+        if not requete:
+            return None
+        masque = self.masques.get(requete)
+        if masque is None:
+            masque = np.ones(len(self), dtype=bool)
+            for condition in requete.split(' && '):
+                decoupe = decoupe_condition(condition)
+                if decoupe is None:
+                    raise ValueError("Filtre non compris : %s" % condition)
+                if decoupe[0] not in self.table.column_names:
+                    raise ValueError("Filtre non compris : pas de colonne %s" % decoupe[0])
+                resultat = pc.fill_null(self.condition(*decoupe), False)
+                masque &= resultat.to_numpy(zero_copy_only=False)
+            self.masques.put(requete, masque)
+        return masque
+
+    # Une page de la table, au format attendu par la DataTable, et le nombre de pages
+    # tri : le sort_by de la DataTable (seule la première colonne est utilisée)
+    def page(self, numero, taille, tri=None, filtre=None):
+        masque = self.masque(filtre)
+        if tri:
+            lignes = self.ordre(tri[0]['column_id'], "descending" if tri[0]['direction'] == 'desc' else "ascending")
+            if masque is not None:
+                lignes = lignes[masque[lignes]]
+        elif masque is not None:
+            lignes = np.flatnonzero(masque)
+        else:
+            lignes = None
+        nombre = len(self) if lignes is None else len(lignes)
+        debut = numero * taille
+        if lignes is None:
+            morceau = self.table.slice(debut, taille)
+        else:
+            morceau = self.table.take(pa.array(lignes[debut:debut + taille]))
+        return morceau.to_pylist(), max(1, math.ceil(nombre / taille))
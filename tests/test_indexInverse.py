@@ -0,0 +1,41 @@
+import os
+import sys
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from tokenisation import Tokenizer
+from indexInverse import IndexInverse, construit_index
+
+
+def index(tmp_path):
+    pq.write_table(pa.table({"idEmail": [0, 1, 2],
+                             "From": ["phillip.allen", "john.arnold", "phillip.allen"],
+                             "Subject": ["Gas prices", "Re: the meeting", "Q3 report"],
+                             "content": ["gas in 2001", "meeting on power", "the gas report"]}),
+                   str(tmp_path / "mails.parquet"))
+    pq.write_table(pa.table({"idEmail": [0, 1, 2], "Thematiques": [["gas"], ["meeting"], ["gas", "report"]]}),
+                   str(tmp_path / "thematiques.parquet"))
+    construit_index(str(tmp_path / "mails.parquet"), str(tmp_path / "thematiques.parquet"),
+                    str(tmp_path / "index"), Tokenizer({"the"}))
+    return IndexInverse(str(tmp_path / "index"))
+
+
+def test_recherche(tmp_path):
+    recherche = index(tmp_path).recherche
+    assert recherche() is None
+    assert list(recherche("gas")) == [0, 2]
+    assert list(recherche("gas report", "Phillip.Allen")) == [2]
+    assert list(recherche(thematique="meeting")) == [1]
+
+
+# Des mots qui ne donnent aucun terme de l'index ne trouvent aucun mail, et sont signalés
+def test_mots_ignores(tmp_path):
+    inverse = index(tmp_path)
+    for mots in ["q3", "the", "re"]:
+        assert len(inverse.recherche(mots)) == 0
+        assert inverse.ignores(mots) == [mots]
+    assert list(inverse.recherche("2001 gas")) == [0, 2]
+    assert inverse.ignores("2001 gas") == ["2001"]
+    assert inverse.ignores("gas") == []
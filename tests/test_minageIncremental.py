@@ -0,0 +1,72 @@
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from minageItemsets import itemsets_frequents, regles_association
+from minageIncremental import MineurIncremental, charge_mineur
+
+THEMATIQUES = ["meeting", "gas", "power", "deal", "report", "contract", "energy", "price"]
+
+
+def transactions_aleatoires(n, graine=0):
+    rng = random.Random(graine)
+    # Des fréquences différentes par thématique, pour avoir des itemsets de plusieurs tailles
+    poids = [8, 6, 5, 4, 3, 2, 2, 1]
+    return [sorted(set(rng.choices(THEMATIQUES, poids, k=rng.randint(1, 4)))) for _ in range(n)]
+
+
+def ordonne(motifs):
+    return dict(sorted(motifs.items(), key=lambda motif: (-motif[1], motif[0])))
+
+
+# Après chaque lot, les itemsets et les règles sont ceux d'une recherche complète
+# sur tous les mails déjà reçus (avec des compactions entre les lots)
+def test_incremental_egal_recherche_complete():
+    transactions = transactions_aleatoires(3000)
+    mineur = MineurIncremental(compaction=3)
+    for debut in range(0, len(transactions), 250):
+        mineur.ajoute(transactions[debut:debut + 250], range(debut, debut + 250))
+        complets = itemsets_frequents(transactions[:debut + 250], 40, "exact")
+        motifs = mineur.motifs(40)
+        assert motifs == complets
+        assert regles_association(ordonne(motifs), 0.5) == regles_association(ordonne(complets), 0.5)
+    assert mineur.nbTransactions == len(transactions)
+
+
+# Un mail déjà inséré n'est pas compté deux fois
+def test_mails_deja_vus_ignores():
+    transactions = transactions_aleatoires(500, graine=1)
+    mineur = MineurIncremental()
+    assert mineur.ajoute(transactions, range(500)) == 500
+    motifs = mineur.motifs(20)
+    assert mineur.ajoute(transactions[100:300], range(100, 300)) == 0
+    assert mineur.ajoute(transactions[400:] + [["gas"]], list(range(400, 500)) + [500]) == 1
+    assert mineur.nbTransactions == 501
+    assert mineur.motifs(20) == itemsets_frequents(transactions + [["gas"]], 20, "exact")
+    assert motifs != mineur.motifs(20)
+
+
+# Deux exports dont les numéros de ligne (idEmail) se recouvrent : les mails sont
+# reconnus par leur Message-ID, ceux du deuxième jour sont bien ajoutés
+def test_lots_avec_memes_numeros_de_ligne():
+    mineur = MineurIncremental()
+    assert mineur.ajoute([["a", "b"], ["a"]], ["<1.JavaMail@lundi>", "<2.JavaMail@lundi>"]) == 2
+    assert mineur.ajoute([["c", "d"], ["c"], ["a"]],
+                         ["<1.JavaMail@mardi>", "<2.JavaMail@mardi>", "<2.JavaMail@lundi>"]) == 2
+    assert mineur.nbTransactions == 4
+    assert mineur.motifs(1)[("c",)] == 2
+    assert mineur.motifs(1)[("a",)] == 2
+    assert len(mineur.mailsVus) == 4
+
+
+def test_sauvegarde(tmp_path):
+    transactions = transactions_aleatoires(400, graine=2)
+    mineur = MineurIncremental()
+    mineur.ajoute(transactions[:200], range(200))
+    fichier = str(tmp_path / "mineur.pkl")
+    mineur.sauvegarde(fichier)
+    repris = charge_mineur(fichier)
+    assert repris.ajoute(transactions, range(400)) == 200
+    assert repris.motifs(15) == itemsets_frequents(transactions, 15, "exact")
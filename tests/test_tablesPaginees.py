@@ -0,0 +1,38 @@
+import os
+import sys
+import pytest
+import pyarrow as pa
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from tablesPaginees import TablePaginee
+
+
+def table():
+    return TablePaginee(pa.table({"Message-ID": ["10", "5", "50", "abc"],
+                                  "content": ["Corps A", "x", "le corps", "CORPS"],
+                                  "lift": [1.0, 5.0, 7.0, None]}))
+
+
+def identifiants(filtre):
+    return [ligne["Message-ID"] for ligne in table().page(0, 10, None, filtre)[0]]
+
+
+def test_filtres():
+    assert identifiants("{content} contains corps") == ["10", "50", "abc"]
+    assert identifiants("{content} icontains corps") == ["10", "50", "abc"]
+    assert identifiants("{content} scontains corps") == ["50"]
+    assert identifiants("{lift} > 4 && {content} contains corps") == ["50"]
+
+
+# Un nombre tapé sur une colonne de texte est comparé tel quel ("5", pas "5.0")
+def test_nombre_sur_colonne_texte():
+    assert identifiants("{Message-ID} = 5") == ["5"]
+    assert identifiants("{Message-ID} > 5") == ["50", "abc"]
+
+
+# Un filtre non compris n'est jamais ignoré
+@pytest.mark.parametrize("filtre", ["{content} like corps", "{inconnue} = 1", "{lift} > abc", "content = 3"])
+def test_filtre_non_compris(filtre):
+    with pytest.raises(ValueError):
+        table().page(0, 10, None, filtre)
@@ -1,24 +1,30 @@
-from nltk import WordNetLemmatizer
-from nltk.corpus import wordnet
 from pandas import *
-import time
+import pandas
+from stockage import ecrire_table, lire_table
+from metriques import Metriques, Progression
+from cacheWordnet import CacheWordnet, FICHIER_CACHE
+import matriceSimilarite
 
 ## Un peu comme une méthode k-means permettant de regrouper les mots les plus proches ##
 ## selon leur similarité. On ne sait pas à l'avance quels mots vont se retrouver avec ##
 ## quels mots.                                                                        ##
 
-def create_thematiques(col,df):
-    start_time = time.time()
+def create_thematiques(col,df,cache=None):
+    # Les appels à wordnet passent par le cache (un mot déjà vu n'est pas recalculé)
+    if cache is None:
+        cache = CacheWordnet()
+    progression = Progression("Mots", total=len(df[col]), pas=100)
     # La liste qui contiendra les thématiques avec tous leurs mots associées
     thematiques = []
     # Les thématiques avec seulement les mots apparaissant de bases en mots associés
     realThematiques = []
     # Pour chaque mot récupéré dans les subjects
     for motBrut in df[col]:
+        progression.avance()
         # On enlève les mots au pluriel
-        mot = WordNetLemmatizer().lemmatize(motBrut)
+        mot = cache.lemme(motBrut)
         # On récupère les mots proches du mot actuel
-        closeWords = wordnet.synsets(mot)
+        closeWords = cache.synsets(mot)
         exist = False
         placementMot = 0
         simMax = 0
@@ -33,15 +39,11 @@ def create_thematiques(col,df):
                 # seulement si le mot existe dans la librairie wordnet
                 if (len(closeWords) != 0):
                     for motsTestés in thematiques[count]:
-                        # On récupère les synonymes d'un des mots
-                        synsetMT = wordnet.synsets(motsTestés)
+                        # On récupère le premier synonyme d'un des mots
+                        synsetMT = cache.premier_synset(motsTestés)
                         # Seulement si le mot existe dans wordnet
-                        if(len(synsetMT) != 0):
-                            # On prend juste le premier
-                            synsetMT = synsetMT[0]
-                            similarity = (closeWords[0]).wup_similarity(synsetMT)
-                            if(similarity == None):
-                                similarity = 0
+                        if(synsetMT is not None):
+                            similarity = cache.similarite(closeWords[0], synsetMT)
                             # On regarde s'ils sont similaires
                             if(similarity >= 0.65):
                                 if similarity > simMax:
@@ -79,8 +81,6 @@ def create_thematiques(col,df):
             # Nouvelle thématique prête, on l'ajoute dans la liste
             thematiques.append(newThematique)
             realThematiques.append(newRealThematique)
-    stop_time = time.time()
-    print("\nTemps de calcul = %f secondes" % (stop_time - start_time))
     print("Nous passons de %d à %d thématiques " % (len(df[col]), len(realThematiques)))
     return realThematiques
 
@@ -103,9 +103,16 @@ def extractThematique(thematiques):
     return thematiques
 
 if __name__ == '__main__':
-    df1 = pandas.read_csv("visualisation/data/map_reduced_subject.csv", low_memory=False, header=0)
+    metriques = Metriques("thematiques2")
+    df1 = lire_table("map_reduced_subject", ["Subject"])
 
-    thematiques1 = create_thematiques("Subject",df1)
+    # Le cache est gardé sur disque pour les exécutions suivantes
+    cache = CacheWordnet(fichier=FICHIER_CACHE)
+    with metriques.etape("clustering", len(df1)):
+        # Même résultat que create_thematiques, avec la matrice de similarité
+        thematiques1 = matriceSimilarite.create_thematiques("Subject",df1,"meilleur",cache)
+    cache.sauvegarde()
     thematiques1 = extractThematique(thematiques1)
     thematiques1 = pandas.DataFrame(thematiques1, columns=["mainThematique","wordsAssociated"])
-    thematiques1.to_csv("visualisation/data/clean_thematiques2.csv")
\ No newline at end of file
+    ecrire_table(thematiques1, "clean_thematiques2")
+    metriques.ecrit_json()
@@ -0,0 +1,51 @@
+import re
+
+## Découpage des sujets (et contenus) de mails en mots ##
+## Partagé par le MapReduce et les analyses du contenu  ##
+
+FICHIER_STOPWORDS = r"visualisation/data/stopwords.txt"
+# Les séparateurs entre les mots d'un sujet
+SEPARATEURS = r"\ |\:|\!|\?|\-|\"|\(|\)|\[|\]|\<|\>|\@|\&|\/|\,|\=|\.|\#|\n|\t|\'"
+
+
+# Les stop words du fichier (séparés par des virgules, des espaces ou des retours à la ligne)
+def lit_stopwords(fichier=None):
+    with open(fichier or FICHIER_STOPWORDS) as stopwords:
+        mots = re.split(r"[\s,;]+", stopwords.read().lower())
+    return frozenset(mot.strip("'\"") for mot in mots if mot.strip("'\""))
+
+
+class Tokenizer:
+    # Les stop words sont chargés une seule fois dans un frozenset, et les
+    # expressions régulières sont compilées une seule fois
+    def __init__(self, stopwords=None, taille_min=3):
+        if stopwords is None:
+            stopwords = lit_stopwords()
+        self.stopwords = frozenset(stopwords)
+        self.taille_min = taille_min
+        self.separateurs = re.compile(SEPARATEURS)
+        self.nombres = re.compile("[0-9]")
+
+    # En un seul passage : minuscules, découpage, puis on enlève les stop words,
+    # les mots trop courts et ceux contenant des chiffres
+    def tokenize(self, texte):
+        stop = self.stopwords
+        taille_min = self.taille_min
+        nombres = self.nombres.search
+        for item in self.separateurs.split(texte.lower()):
+            if len(item) >= taille_min and item not in stop and not nombres(item):
+                yield item
+
+    def tokens(self, texte):
+        return list(self.tokenize(texte))
+
+
+# Un tokenizer partagé, chargé à la première utilisation
+_tokenizer = None
+
+
+def tokenizer_projet():
+    global _tokenizer
+    if _tokenizer is None:
+        _tokenizer = Tokenizer()
+    return _tokenizer
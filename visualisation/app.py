@@ -1,4 +1,3 @@
-import csv
 import dash
 import dash_bootstrap_components as dbc
 import dash_core_components as dcc
@@ -6,14 +5,23 @@ import dash_table as dt
 import dash_html_components as html
 from dash.dependencies import Input, Output
 import plotly.express as px
-import pandas as pd
-import itertools
+import os
+import sys
+import time
+import pyarrow as pa
+from functools import lru_cache
+# Les modules du projet sont à la racine du dépôt
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from artefacts import Artefacts
+from tablesPaginees import TablePaginee
+from cacheCallbacks import CacheCallbacks
+from flask import jsonify
 
-from sklearn.decomposition import PCA
-from sklearn.preprocessing import StandardScaler
 from whitenoise import WhiteNoise
 
-app = dash.Dash(external_stylesheets=[dbc.themes.BOOTSTRAP])
+# Les tables des pages ne sont pas dans le layout de départ : leurs callbacks sont
+# déclarés avant qu'elles n'existent
+app = dash.Dash(external_stylesheets=[dbc.themes.BOOTSTRAP], suppress_callback_exceptions=True)
 
 app.title = 'DataScience-Thématiques'
 
@@ -69,7 +77,8 @@ sidebar = html.Div(
                             style={"color": "white", 'font-weight': 'bold'}),
                 dbc.NavLink("4- Patterns Fréquents", href="/patternsFrequents", active="exact", style={"color": "white", 'font-weight': 'bold'}),
                 dbc.NavLink("5- ACP", href="/acp", active="exact", style={"color": "white", 'font-weight': 'bold'}),
-                dbc.NavLink("6- Amélioration : correction de nos analyses", href="/ameliorationCorrection", active="exact", style={"color": "white", 'font-weight': 'bold'})
+                dbc.NavLink("6- Amélioration : correction de nos analyses", href="/ameliorationCorrection", active="exact", style={"color": "white", 'font-weight': 'bold'}),
+                dbc.NavLink("7- Recherche dans les mails", href="/recherche", active="exact", style={"color": "white", 'font-weight': 'bold'})
             ],
             vertical=True,
             pills=True,
@@ -144,259 +153,301 @@ logos = html.Div([
 ], style={'textAlign':'center'})
 
 
-# La page avec les thématiques
-def extractThemsCount(csvName):
-    with open(csvName, newline='') as f:  # Ouverture du fichier CSV
-        read = csv.reader(f)  # chargement des lignes du fichier csv
-        columns_name = ["Thématiques", "Nombre de mots"]
-        themes = []
-        length = []
-        i = 0
-        dic = {}
-        for line in read:
-            # La première ligne correspond aux titres
-            if (i == 0):
-                i = 1
-            else:
-                dic[line[1]] = len((line[2]).split(","))
-                themes.append(line[1])
-                length.append(len((line[2]).split(",")))
-        sorted_dic = sorted(dic.items(), key=lambda item: item[1], reverse=True)
-        final_dic = {k: v for k, v in sorted_dic}
-    return [columns_name, final_dic]
-
-
-def extractTabThemsCount(number,csvName):
-    datas = extractThemsCount(csvName)
-    dic = dict(itertools.islice(datas[1].items(), number))
-    return [datas[0], dic.keys(), dic.values()]
-
-
-# On utilise les méthodes afin de les envoyer au dashboard
-data = extractTabThemsCount(10,'data/clean_thematiques.csv')
-
-df = pd.DataFrame({
-    data[0][0]: data[1],
-    data[0][1]: data[2]
-})
-
-figThematique = px.bar(df, x=data[0][0], y=data[0][1])
-
-thematiquesCount = html.Div(children=[
-    html.H5(children='Les premières thématiques avec le nombre de mots les composant'),
-    dcc.Graph(
-        figure=figThematique
-    )])
+## Les pages sont construites à leur première visite, puis gardées en mémoire ##
+## Elles ne lisent que le paquet d'artefacts écrit par artefacts.py : aperçus, données ##
+## des graphiques et comptes y sont déjà calculés.                                     ##
+
+artefacts = Artefacts("data/artefacts")
+
+# Les résultats des callbacks sont gardés pour la version du paquet. La variable
+# d'environnement DOSSIER_CACHE donne un dossier partagé par les workers gunicorn.
+cacheCallbacks = CacheCallbacks(artefacts.version, dossier=os.environ.get("DOSSIER_CACHE"))
+
+
+# Les succès et échecs du cache, en JSON
+@server.route("/metriques-cache")
+def metriques_cache():
+    return jsonify(cacheCallbacks.metriques())
+
+
+# Le graphique des premières thématiques avec le nombre de mots les composant
+def graphique_thematiques(nom):
+    df = artefacts.table(nom)
+    figThematique = px.bar(df, x="Thématiques", y="Nombre de mots")
+
+    return html.Div(children=[
+        html.H5(children='Les premières thématiques avec le nombre de mots les composant'),
+        dcc.Graph(
+            figure=figThematique
+        )])
+
+
+# Les tables complètes sont paginées, triées et filtrées par le serveur :
+# le navigateur ne reçoit que la page affichée
+TABLES_SERVEUR = {
+    'tabDataFormated': "mails",
+    'tabDataThematiques': "thematiques",
+    'table': "itemsets",
+    'table2': "itemsets2",
+    'tabRegles': "regles",
+}
+
+
+@lru_cache(maxsize=None)
+def table_paginee(nom):
+    return TablePaginee(artefacts.arrow(nom))
+
+
+# La table, et sous elle le message d'erreur de son filtre
+def table_serveur(id, taille=10, **style):
+    return html.Div([dt.DataTable(
+        id=id,
+        columns=[{"name": i, "id": i} for i in artefacts.arrow(TABLES_SERVEUR[id]).column_names],
+        page_current=0,
+        page_size=taille,
+        page_action='custom',
+        sort_action='custom',
+        sort_by=[],
+        filter_action='custom',
+        filter_query='',
+        **style
+    ), html.P(id=id + "Filtre", style={'color': 'red'})])
+
+
+def callback_table(id, nom):
+    @cacheCallbacks.memoise(nom="table_" + nom)
+    def page_table(page_current, page_size, sort_by, filter_query):
+        return table_paginee(nom).page(page_current or 0, page_size, sort_by, filter_query)
+
+    # Un filtre non compris n'affiche aucune ligne, et dit pourquoi (l'erreur n'est pas gardée en cache)
+    @app.callback([Output(id, "data"), Output(id, "page_count"), Output(id + "Filtre", "children")],
+                  [Input(id, "page_current"), Input(id, "page_size"), Input(id, "sort_by"), Input(id, "filter_query")])
+    def affiche_table(page_current, page_size, sort_by, filter_query):
+        try:
+            data, nombre = page_table(page_current, page_size, sort_by, filter_query)
+        except ValueError as erreur:
+            return [], 1, str(erreur)
+        return data, nombre, ""
+
+
+for id, nom in TABLES_SERVEUR.items():
+    callback_table(id, nom)
+
 
 # La page de formatage des données
-donnees_formatees = pd.read_csv("data/formatted_data.csv")
-formatage_page = html.Div(children=[
-    html.H2('1- Formatage des Données'),
-    html.H3('1) Suppression des mails n\'étant pas sous un bon format'),
-    html.Ul(children=[
-        html.Li("On garde seulement les colonnes 'id', 'From', 'To', 'Subject' et 'Content', "
-                "les autres ne nous seront pas utiles par la suite,"),
-        html.Li("Formatage des noms des expéditeurs sous la forme début_mail(@mail.com), "
-                "par exemple, “phillip.allen@enron.com” devient phillip.allen,"),
-        html.Li("Suppression des mails qui ne sont pas au bon format de données (décalages, lignes vides etc.),"),
-        html.Li("Suppression des mails qui ne comportent ni contenu, ni sujet à la fois.")
-    ]),
-    html.Hr(),
-    html.P("Nous nous retrouvons avec 99 770 mails, au lieu de 100 000 mails."),
-    html.P("Les données semblaient assez \"propres\", car nous avons retiré que très peu de mails."),
-    html.H3('2) Aperçu de nos données formatées'),
-    dt.DataTable(
-        id='tabDataFormated',
-        style_cell={
-            'whiteSpace': 'normal',
-            'height': 'auto',
-            'textOverflow': 'ellipsis',
-            'maxWidth': 0,
-            'textAlign': 'left'
-        },
-        style_data={
-            'whiteSpace': 'normal',
-            'height': 'auto',
-        },
-        columns=[{"name": i, "id": i} for i in donnees_formatees.iloc[:, 1:6]],
-        data=donnees_formatees.head().to_dict('records'),
-        sort_action="native"
-    ),
-    html.Hr(),
-])
+@lru_cache(maxsize=None)
+def page_formatage():
+    return html.Div(children=[
+        html.H2('1- Formatage des Données'),
+        html.H3('1) Suppression des mails n\'étant pas sous un bon format'),
+        html.Ul(children=[
+            html.Li("On garde seulement les colonnes 'id', 'From', 'To', 'Subject' et 'Content', "
+                    "les autres ne nous seront pas utiles par la suite,"),
+            html.Li("Formatage des noms des expéditeurs sous la forme début_mail(@mail.com), "
+                    "par exemple, “phillip.allen@enron.com” devient phillip.allen,"),
+            html.Li("Suppression des mails qui ne sont pas au bon format de données (décalages, lignes vides etc.),"),
+            html.Li("Suppression des mails qui ne comportent ni contenu, ni sujet à la fois.")
+        ]),
+        html.Hr(),
+        html.P("Nous nous retrouvons avec 99 770 mails, au lieu de 100 000 mails."),
+        html.P("Les données semblaient assez \"propres\", car nous avons retiré que très peu de mails."),
+        html.H3('2) Aperçu de nos données formatées'),
+        table_serveur(
+            'tabDataFormated',
+            taille=5,
+            style_cell={
+                'whiteSpace': 'normal',
+                'height': 'auto',
+                'textOverflow': 'ellipsis',
+                'maxWidth': 0,
+                'textAlign': 'left'
+            },
+            style_data={
+                'whiteSpace': 'normal',
+                'height': 'auto',
+            },
+        ),
+        html.Hr(),
+    ])
+
 
 # La page présentant le map reduce
-map_reduce_data = pd.read_csv("data/map_reduced_subject.csv")
-map_reduce_page = html.Div(children=[
-    html.H2('2- Création de thématiques avec MapReduce :'),
-    html.H3('1) Les différentes étapes de notre MapReduce'),
-    html.Ul(children=[
-        html.Li("1 Récupération du sujet de tous les mails,"),
-        html.Li("2 Suppression des lignes vides (Sans sujet),"),
-        html.Li("3 Passage des sujets en minuscules, puis split de chaque mot (Nous nous retrouvons avec "
-                "une grande liste de tous les mots rencontrés dans les sujets des mails),"),
-        html.Li("4 Enlever les mots inutiles (stop-words),"),
-        html.Li("5 Associer un 1 à chaque mot,"),
-        html.Li("6 Réduire les mots identiques et additionner le compteur,"),
-        html.Li("7 Garder uniquement les mots apparaissant au moins 200 fois.")
-    ]),
-    html.Hr(),
-    html.P("Nous nous retrouvons avec %d mots différents." % (len(map_reduce_data))),
-    html.H3('2) Aperçu des mots ressortant les plus dans les mails'),
-    dt.DataTable(
-        id='tabDataMapReduce',
-        style_cell={
-            'whiteSpace': 'normal',
-            'height': 'auto',
-            'textOverflow': 'ellipsis',
-            'maxWidth': 0,
-            'textAlign': 'left'
-        },
-        style_data={
-            'whiteSpace': 'normal',
-            'height': 'auto',
-        },
-        columns=[{"name": i, "id": i} for i in map_reduce_data.columns],
-        data=map_reduce_data[:20].to_dict('records'),
-        sort_action="native"
-    ),
-    html.Hr(),
-    html.H3('3) Critiques de notre MapReduce'),
-    html.Ul(children=[
-        html.Li("Toujours des mots ayant peu d'intérêt ('fwd' par exemple), mais ils sont peu nombreux,"),
-        html.Li("Utilisation seulement du sujet des mails, et non pas du contenu => Pertinence des mots récupérés ?")
-    ]),
-    html.Hr(),
-])
+@lru_cache(maxsize=None)
+def page_map_reduce():
+    map_reduce_data = artefacts.table("map_reduce_apercu")
+    return html.Div(children=[
+        html.H2('2- Création de thématiques avec MapReduce :'),
+        html.H3('1) Les différentes étapes de notre MapReduce'),
+        html.Ul(children=[
+            html.Li("1 Récupération du sujet de tous les mails,"),
+            html.Li("2 Suppression des lignes vides (Sans sujet),"),
+            html.Li("3 Passage des sujets en minuscules, puis split de chaque mot (Nous nous retrouvons avec "
+                    "une grande liste de tous les mots rencontrés dans les sujets des mails),"),
+            html.Li("4 Enlever les mots inutiles (stop-words),"),
+            html.Li("5 Associer un 1 à chaque mot,"),
+            html.Li("6 Réduire les mots identiques et additionner le compteur,"),
+            html.Li("7 Garder uniquement les mots apparaissant au moins 200 fois.")
+        ]),
+        html.Hr(),
+        html.P("Nous nous retrouvons avec %d mots différents." % artefacts.compte("mots")),
+        html.H3('2) Aperçu des mots ressortant les plus dans les mails'),
+        dt.DataTable(
+            id='tabDataMapReduce',
+            style_cell={
+                'whiteSpace': 'normal',
+                'height': 'auto',
+                'textOverflow': 'ellipsis',
+                'maxWidth': 0,
+                'textAlign': 'left'
+            },
+            style_data={
+                'whiteSpace': 'normal',
+                'height': 'auto',
+            },
+            columns=[{"name": i, "id": i} for i in map_reduce_data.columns],
+            data=map_reduce_data.to_dict('records'),
+            sort_action="native"
+        ),
+        html.Hr(),
+        html.H3('3) Critiques de notre MapReduce'),
+        html.Ul(children=[
+            html.Li("Toujours des mots ayant peu d'intérêt ('fwd' par exemple), mais ils sont peu nombreux,"),
+            html.Li("Utilisation seulement du sujet des mails, et non pas du contenu => Pertinence des mots récupérés ?")
+        ]),
+        html.Hr(),
+    ])
+
 
 # La page présentant les thématiques clean
-clean_thematiques_data = pd.read_csv("data/clean_thematiques.csv")
-extract_thematiques_page = html.Div(children=[
-    html.H2('3- Extraction des thématiques : clustering'),
-    html.H3('1) Les différentes étapes de regroupement des mots'),
-    html.Ul(children=[
-        html.Li("1 On passe nos mots au singulier, pour éviter les doublons,"),
-        html.Li("2 Mot proche d'un des autres mots, ou de ses synonymes ? (Librairie WordNet pour avoir la similarité"
-                " entre 2 mots, et les synonymes d'un mot),"),
-        html.Li("- Oui, alors on les regroupe ensemble, "),
-        html.Li("- Non, alors on crée une nouvelle thématique comprenant ce mot,"),
-        html.Li("3 Le mot du cluster ressortant le plus donnera son nom à la thématique.")
-    ]),
-    html.Hr(),
-    html.P("Nous nous retrouvons avec %d thématiques différentes." % (len(clean_thematiques_data))),
-    html.H3('2) Aperçu des premières thématiques extraites'),
-    dt.DataTable(
-        id='tabDataThematiques',
-        style_cell={
-            'whiteSpace': 'normal',
-            'height': 'auto',
-            'textOverflow': 'ellipsis',
-            'maxWidth': 0,
-            'textAlign': 'left'
-        },
-        style_data={
-            'whiteSpace': 'normal',
-            'height': 'auto',
-        },
-        columns=[{"name": i, "id": i} for i in clean_thematiques_data.iloc[:, 1:3]],
-        data=clean_thematiques_data[:10].to_dict('records'),
-        sort_action="native"
-    ),
-    html.Hr(),
-    html.H3('3) Critiques de notre extraction de thématiques'),
-    html.Ul(children=[
-        html.Li("Mots proches si similaires au moins à 65% (assez faible) => des mots regroupés ensembles"
-                " qui ne devraient pas vraiment l'être (trop de mots dans une même thématique),"),
-        html.Li("Beaucoup de thématiques composées d'un seul mot.")
-    ]),
-    html.Hr(),
-    thematiquesCount,
-    html.Hr(),
-])
+@lru_cache(maxsize=None)
+def page_thematiques():
+    return html.Div(children=[
+        html.H2('3- Extraction des thématiques : clustering'),
+        html.H3('1) Les différentes étapes de regroupement des mots'),
+        html.Ul(children=[
+            html.Li("1 On passe nos mots au singulier, pour éviter les doublons,"),
+            html.Li("2 Mot proche d'un des autres mots, ou de ses synonymes ? (Librairie WordNet pour avoir la similarité"
+                    " entre 2 mots, et les synonymes d'un mot),"),
+            html.Li("- Oui, alors on les regroupe ensemble, "),
+            html.Li("- Non, alors on crée une nouvelle thématique comprenant ce mot,"),
+            html.Li("3 Le mot du cluster ressortant le plus donnera son nom à la thématique.")
+        ]),
+        html.Hr(),
+        html.P("Nous nous retrouvons avec %d thématiques différentes." % artefacts.compte("thematiques")),
+        html.H3('2) Aperçu des premières thématiques extraites'),
+        table_serveur(
+            'tabDataThematiques',
+            style_cell={
+                'whiteSpace': 'normal',
+                'height': 'auto',
+                'textOverflow': 'ellipsis',
+                'maxWidth': 0,
+                'textAlign': 'left'
+            },
+            style_data={
+                'whiteSpace': 'normal',
+                'height': 'auto',
+            },
+        ),
+        html.Hr(),
+        html.H3('3) Critiques de notre extraction de thématiques'),
+        html.Ul(children=[
+            html.Li("Mots proches si similaires au moins à 65% (assez faible) => des mots regroupés ensembles"
+                    " qui ne devraient pas vraiment l'être (trop de mots dans une même thématique),"),
+            html.Li("Beaucoup de thématiques composées d'un seul mot.")
+        ]),
+        html.Hr(),
+        graphique_thematiques("thematiques_mots"),
+        html.Hr(),
+    ])
+
 
 # La page pour les patterns fréquents
-itemsets = pd.read_csv("data/itemsetsFrequents.csv", low_memory=False, header=0)
-mails_thematiques = pd.read_csv("data/mails_thematiques.csv")
-patternsFrequents = html.Div(children=[
-    html.H2('4- Patterns fréquents'),
-    html.H3('1) Les différentes étapes pour déterminer les patterns fréquents'),
-    html.Ul(children=[
-        html.Li("1 Associer les mails aux thématiques (Pour chaque mail, on regarde s'il contient, "
-                "pour chaque thématique, un des mots la composant. "
-                "Chaque mail se voit donc associé à une liste de thématiques),"),
-        html.Li("2 Faire ressortir les itemsets fréquents à l'aide de la librairie fp_growth,"),
-        html.Li("3 Garder les itemsets ressortant au moins 100 fois.")
-    ]),
-    html.Hr(),
-    html.P("Nous nous retrouvons avec %d mails comportant des thématiques." % (len(mails_thematiques))),
-    html.H3(children='2) Les différentes thématiques associées ensembles'),
-    dt.DataTable(
-        id='table',
-        columns=[{"name": i, "id": i} for i in itemsets.iloc[:, 1:3]],
-        data=itemsets.to_dict('records'),
-        sort_action="native",
-        style_cell={'textAlign': 'left'},
-        style_data={
-            'whiteSpace': 'normal',
-            'height': 'auto',
-        }
-    ),
-    html.Hr(),
-    html.H3(children='3) Critiques de notre fp-growth'),
-    html.Ul(children=[
-        html.Li("On a seulement gardé les mails comportant au moins une thématique => 70% des mails en moins,"),
-        html.Li("Algorithme pour associer les thématiques au mail glouton => 8min40s,"),
-        html.Li("Qualité douteuse de certaines thématiques => 'meeting', biaise un peu nos résultats."),
-    ]),
-    html.Hr()
-])
+@lru_cache(maxsize=None)
+def page_patterns():
+    return html.Div(children=[
+        html.H2('4- Patterns fréquents'),
+        html.H3('1) Les différentes étapes pour déterminer les patterns fréquents'),
+        html.Ul(children=[
+            html.Li("1 Associer les mails aux thématiques (Pour chaque mail, on regarde s'il contient, "
+                    "pour chaque thématique, un des mots la composant. "
+                    "Chaque mail se voit donc associé à une liste de thématiques),"),
+            html.Li("2 Faire ressortir les itemsets fréquents à l'aide de la librairie fp_growth,"),
+            html.Li("3 Garder les itemsets ressortant au moins 100 fois.")
+        ]),
+        html.Hr(),
+        html.P("Nous nous retrouvons avec %d mails comportant des thématiques." % artefacts.compte("mails_thematiques")),
+        html.H3(children='2) Les différentes thématiques associées ensembles'),
+        table_serveur(
+            'table',
+            style_cell={'textAlign': 'left'},
+            style_data={
+                'whiteSpace': 'normal',
+                'height': 'auto',
+            }
+        ),
+        html.H5(children='Les règles d\'association, des plus fortes aux plus faibles (lift)'),
+        table_serveur(
+            'tabRegles',
+            style_cell={'textAlign': 'left'},
+            style_data={
+                'whiteSpace': 'normal',
+                'height': 'auto',
+            }
+        ),
+        html.Hr(),
+        html.H3(children='3) Critiques de notre fp-growth'),
+        html.Ul(children=[
+            html.Li("On a seulement gardé les mails comportant au moins une thématique => 70% des mails en moins,"),
+            html.Li("Algorithme pour associer les thématiques au mail glouton => 8min40s,"),
+            html.Li("Qualité douteuse de certaines thématiques => 'meeting', biaise un peu nos résultats."),
+        ]),
+        html.Hr()
+    ])
 
 
-data_exp = pd.read_csv("data/exp_mails.csv")
-data_exp = data_exp[["From","Nombre d'emails envoyés"]].sort_values(by=['Nombre d\'emails envoyés'],ascending=False)
-
-figExp = px.bar(data_exp, x="From", y="Nombre d'emails envoyés")
-
-count_mail_exp = html.Div(children=[
-    html.H5(children='Le nombre d\'emails envoyé pour chaque expéditeur'),
-    dcc.Graph(
-        figure=figExp
-    )])
-
-data_exp_thematiques_acp = pd.read_csv("data/extracted_data.csv")
-tab_exp_thematiques_acp = html.Div(children=[
-    dt.DataTable(
-        id='tab',
-        columns=[{"name": i, "id": i} for i in data_exp_thematiques_acp.iloc[:, 0:5]],
-        data=data_exp_thematiques_acp.head().to_dict('records'),
-        sort_action="native",
-        style_cell={'textAlign': 'left'},
-        style_data={
-            'whiteSpace': 'normal',
-            'height': 'auto',
-        }
-    )
-])
+# Un aperçu du tableau des individus
+def apercu_tableau_acp(nom):
+    data_exp_thematiques_acp = artefacts.table(nom)
+    return html.Div(children=[
+        dt.DataTable(
+            id='tab',
+            columns=[{"name": i, "id": i} for i in data_exp_thematiques_acp.columns],
+            data=data_exp_thematiques_acp.to_dict('records'),
+            sort_action="native",
+            style_cell={'textAlign': 'left'},
+            style_data={
+                'whiteSpace': 'normal',
+                'height': 'auto',
+            }
+        )
+    ])
+
+
+# L'AFC du tableau de contingence (calculée par extractFrom.py sur le tableau creux)
+def resultats_afc():
+    afcValeurs = artefacts.table("afc_valeurs_propres")
+    afcThematiques = artefacts.table("afc_thematiques")
+    figAfcVP = px.bar(afcValeurs, x="Dimension", y="Part d'inertie")
+    # Expéditeurs et thématiques sur le premier plan factoriel
+    figAfcPlan = px.scatter(artefacts.table("afc_plan"), x="Dim 1", y="Dim 2", color="Type", hover_name="Nom",
+                            hover_data=["Contribution 1", "Cos2 1", "Contribution 2", "Cos2 2"])
+    return html.Div(children=[
+        html.H5(children='Les parts d\'inertie des axes de l\'AFC'),
+        dcc.Graph(figure=figAfcVP),
+        html.H5(children='Expéditeurs et thématiques sur le premier plan de l\'AFC'),
+        dcc.Graph(figure=figAfcPlan),
+        html.H5(children='Contributions et qualité de représentation (cos²) des thématiques'),
+        dt.DataTable(
+            id='tabAfc',
+            columns=[{"name": i, "id": i} for i in afcThematiques.columns],
+            data=afcThematiques.to_dict('records'),
+            sort_action="native",
+            page_size=10,
+            style_cell={'textAlign': 'left'},
+        )
+    ])
 
-def valeurs_propres(df):
-    X = df
-    del X['Unnamed: 0']
-    # instanciation
-    sc = StandardScaler()
-    # transformation – centrage
-    Z = sc.fit_transform(X)
-    acp = PCA(svd_solver='full')
-    coord = acp.fit_transform(Z)
-    eigenvalues = acp.explained_variance_ratio_[:10]
-    return eigenvalues
-
-dfVP = valeurs_propres(data_exp_thematiques_acp)
-figVP = px.bar(dfVP, labels={"index": "Dimension", "value": "Part d'inertie"})
-count_val_propres = html.Div(children=[
-    html.H5(children='Les parts d\'inertie des premières valeurs propres'),
-    dcc.Graph(
-        figure=figVP
-    )])
 
 layoutNuageInd = html.Div([
     html.H3("Nuage des individus"),
@@ -408,71 +459,65 @@ layoutNuageVar = html.Div([
     html.Img(src='nuageVar.png', style={'width': '60%', 'textAlign': 'center'})
 ])
 
-acp_layout = html.Div(children=[
-    html.H2('5- ACP'),
-    html.H3('1) Préparation de l\'ACP'),
-    html.P("Nous avons choisi de faire une ACP afin de :"),
-    html.Ul(children=[
-        html.Li("Représenter les 73 individus sur 2 dimensions,"),
-        html.Li("Représenter les 66 thématiques sur 2 dimensions,"),
-        html.Li("Voir si on peut mettre en lien les individus et les thématiques,"),
-        html.Li("Identifier des individus atypiques ou des comportements moyens.")
-    ]),
-    html.Hr(),
-    html.H3('2) Tableau de données des individus, et du nombre de fois qu\'ils traitent chaque thématique'),
-    tab_exp_thematiques_acp,
-    html.Hr(),
-    count_mail_exp,
-    html.H3('3) Les valeurs propres'),
-    count_val_propres,
-    html.Hr(),
-    html.H3('4) Résultats de l\'ACP'),
-    layoutNuageInd,
-    html.Hr(),
-    layoutNuageVar,
-    html.Hr(),
-    html.H3('5) Critiques'),
-    html.Ul(children=[
-        html.Li("60% de perte de données,"),
-        html.Li("Nous n'avons pu analyser que peu d’individus => 8 individus sur 73,"),
-        html.Li("Thématiques => majorité sur l'axe 1,"),
-        html.Li("Individus => majorité au centre du graphe."),
-    ]),
-    html.H6('Important : toutes les interprétations faites ne sont pas vraiment fiables.'),
-    html.Hr(),
-])
 
+@lru_cache(maxsize=None)
+def page_acp():
+    data_exp = artefacts.table("expediteurs_mails")
+
+    figExp = px.bar(data_exp, x="From", y="Nombre d'emails envoyés")
+
+    count_mail_exp = html.Div(children=[
+        html.H5(children='Le nombre d\'emails envoyé pour chaque expéditeur'),
+        dcc.Graph(
+            figure=figExp
+        )])
+
+    dfVP = artefacts.table("acp_valeurs_propres")
+    figVP = px.bar(dfVP, x="Dimension", y="Part d'inertie")
+    count_val_propres = html.Div(children=[
+        html.H5(children='Les parts d\'inertie des premières valeurs propres'),
+        dcc.Graph(
+            figure=figVP
+        )])
+
+    return html.Div(children=[
+        html.H2('5- ACP'),
+        html.H3('1) Préparation de l\'ACP'),
+        html.P("Nous avons choisi de faire une ACP afin de :"),
+        html.Ul(children=[
+            html.Li("Représenter les 73 individus sur 2 dimensions,"),
+            html.Li("Représenter les 66 thématiques sur 2 dimensions,"),
+            html.Li("Voir si on peut mettre en lien les individus et les thématiques,"),
+            html.Li("Identifier des individus atypiques ou des comportements moyens.")
+        ]),
+        html.Hr(),
+        html.H3('2) Tableau de données des individus, et du nombre de fois qu\'ils traitent chaque thématique'),
+        apercu_tableau_acp("individus_apercu"),
+        html.Hr(),
+        count_mail_exp,
+        html.H3('3) Les valeurs propres'),
+        count_val_propres,
+        html.Hr(),
+        html.H3('4) Résultats de l\'ACP'),
+        layoutNuageInd,
+        html.Hr(),
+        layoutNuageVar,
+        html.Hr(),
+        html.H3('5) Critiques'),
+        html.Ul(children=[
+            html.Li("60% de perte de données,"),
+            html.Li("Nous n'avons pu analyser que peu d’individus => 8 individus sur 73,"),
+            html.Li("Thématiques => majorité sur l'axe 1,"),
+            html.Li("Individus => majorité au centre du graphe."),
+        ]),
+        html.H6('Important : toutes les interprétations faites ne sont pas vraiment fiables.'),
+        html.Hr(),
+        html.H3('6) Analyse factorielle des correspondances (AFC)'),
+        html.P("L'AFC est faite directement sur le tableau de contingence des expéditeurs et des thématiques, avec la distance du khi-deux."),
+        resultats_afc(),
+        html.Hr(),
+    ])
 
-# On utilise les méthodes afin de les envoyer au dashboard
-data2 = extractTabThemsCount(10,'data/clean_thematiques2.csv')
-
-df2 = pd.DataFrame({
-    data2[0][0]: data2[1],
-    data2[0][1]: data2[2]
-})
-
-figExp2 = px.bar(df2, x=data2[0][0], y=data2[0][1])
-
-thematiquesCount2 = html.Div(children=[
-    html.H5(children='Les premières thématiques avec le nombre de mots les composant'),
-    dcc.Graph(
-        figure=figExp2
-    )])
-
-data_exp_thematiques_acp2 = pd.read_csv("data/extracted_data2.csv")
-tab_exp_thematiques_acp2 = html.Div(children=[
-    dt.DataTable(
-        id='tab',
-        columns=[{"name": i, "id": i} for i in data_exp_thematiques_acp2.iloc[:, 0:5]],
-        data=data_exp_thematiques_acp2.head().to_dict('records'),
-        sort_action="native",
-        style_cell={'textAlign': 'left'},
-        style_data={
-            'whiteSpace': 'normal',
-            'height': 'auto',
-        }
-    )
-])
 
 layoutNuageInd2 = html.Div([
     html.H3("Nuage des individus"),
@@ -484,36 +529,120 @@ layoutNuageVar2 = html.Div([
     html.Img(src='nuageVar2.png', style={'width': '60%', 'textAlign': 'center'})
 ])
 
-itemsets2 = pd.read_csv("data/itemsetsFrequents2.csv")
-amelioration_page = html.Div(children=[
-    html.H2('6- Amélioration : correction de nos analyses'),
-    html.H3('1) Meilleure façon d\'associer les mails aux thématiques'),
-    html.P("Nous nous sommes rendus compte au dernier moment que notre association de thématiques aux mails "
-           "était complètement naïve (Se met avec le premier mot proche, sans regarder les autres)"),
-    thematiquesCount2,
-    html.Hr(),
-    html.H3('2) Nouveau tableau de données des individus, et du nombre de fois qu\'ils traitent chaque thématique'),
-    tab_exp_thematiques_acp2,
-    html.Hr(),
-    html.H3(children='3) Les thématiques associées ensembles'),
-    dt.DataTable(
-        id='table',
-        columns=[{"name": i, "id": i} for i in itemsets2.iloc[:, 1:3]],
-        data=itemsets2.to_dict('records'),
-        sort_action="native",
-        style_cell={'textAlign': 'left'},
-        style_data={
-            'whiteSpace': 'normal',
-            'height': 'auto',
-        }
-    ),
-    html.Hr(),
-    html.H3('4) Nouveaux résultats de l\'ACP'),
-    layoutNuageInd2,
-    html.Hr(),
-    layoutNuageVar2,
-    html.Hr(),
-])
+
+@lru_cache(maxsize=None)
+def page_amelioration():
+    return html.Div(children=[
+        html.H2('6- Amélioration : correction de nos analyses'),
+        html.H3('1) Meilleure façon d\'associer les mails aux thématiques'),
+        html.P("Nous nous sommes rendus compte au dernier moment que notre association de thématiques aux mails "
+               "était complètement naïve (Se met avec le premier mot proche, sans regarder les autres)"),
+        graphique_thematiques("thematiques_mots2"),
+        html.Hr(),
+        html.H3('2) Nouveau tableau de données des individus, et du nombre de fois qu\'ils traitent chaque thématique'),
+        apercu_tableau_acp("individus_apercu2"),
+        html.Hr(),
+        html.H3(children='3) Les thématiques associées ensembles'),
+        table_serveur(
+            'table2',
+            style_cell={'textAlign': 'left'},
+            style_data={
+                'whiteSpace': 'normal',
+                'height': 'auto',
+            }
+        ),
+        html.Hr(),
+        html.H3('4) Nouveaux résultats de l\'ACP'),
+        layoutNuageInd2,
+        html.Hr(),
+        layoutNuageVar2,
+        html.Hr(),
+    ])
+
+
+# La page de recherche dans tous les mails, avec l'index inversé du paquet d'artefacts
+@lru_cache(maxsize=None)
+def page_recherche():
+    thematiques = artefacts.index().termes_champ("thematique")
+    return html.Div(children=[
+        html.H2('7- Recherche dans les mails'),
+        html.P("Les mots sont cherchés dans le sujet et le contenu des mails, découpés comme pour le MapReduce. "
+               "Les mails trouvés contiennent tous les mots demandés."),
+        dbc.Row([
+            dbc.Col(dcc.Input(id='rechercheMots', type='text', debounce=True,
+                              placeholder='Mots du sujet ou du contenu', style={'width': '100%'})),
+            dbc.Col(dcc.Input(id='rechercheExpediteur', type='text', debounce=True,
+                              placeholder='Expéditeur (ex : phillip.allen)', style={'width': '100%'})),
+            dbc.Col(dcc.Dropdown(id='rechercheThematique', placeholder='Thématique',
+                                 options=[{"label": i, "value": i} for i in thematiques])),
+        ]),
+        html.Hr(),
+        html.P(id='rechercheResultats'),
+        dt.DataTable(
+            id='tabRecherche',
+            style_cell={
+                'whiteSpace': 'normal',
+                'height': 'auto',
+                'textOverflow': 'ellipsis',
+                'maxWidth': 0,
+                'textAlign': 'left'
+            },
+            columns=[{"name": i, "id": i} for i in artefacts.arrow("mails").column_names],
+            page_current=0,
+            page_size=10,
+            page_action='custom'
+        ),
+        html.Hr(),
+    ])
+
+
+# Une nouvelle recherche repart de la première page
+@app.callback(Output('tabRecherche', "page_current"),
+              [Input('rechercheMots', "value"), Input('rechercheExpediteur', "value"), Input('rechercheThematique', "value")])
+def nouvelle_recherche(mots, expediteur, thematique):
+    return 0
+
+
+@app.callback([Output('tabRecherche', "data"), Output('tabRecherche', "page_count"), Output('rechercheResultats', "children")],
+              [Input('rechercheMots', "value"), Input('rechercheExpediteur', "value"), Input('rechercheThematique', "value"),
+               Input('tabRecherche', "page_current"), Input('tabRecherche', "page_size")])
+def recherche_mails(mots, expediteur, thematique, page_current, page_size):
+    debut = time.perf_counter()
+    data, nombre = resultats_recherche(mots, expediteur, thematique, page_current, page_size)
+    texte = "%d mails trouvés en %.1f ms." % (nombre, (time.perf_counter() - debut) * 1000)
+    ignores = artefacts.index().ignores(mots)
+    if ignores:
+        texte += " Mots ignorés (mots vides, trop courts ou avec des chiffres) : %s." % ", ".join(ignores)
+    return data, max(1, -(-nombre // page_size)), texte
+
+
+# Une page des mails trouvés, et leur nombre
+@cacheCallbacks.memoise
+def resultats_recherche(mots, expediteur, thematique, page_current, page_size):
+    mails = artefacts.index().recherche(mots, expediteur, thematique)
+    table = artefacts.arrow("mails")
+    premier = (page_current or 0) * page_size
+    # Sans critère, on parcourt tous les mails
+    if mails is None:
+        nombre = table.num_rows
+        page = table.slice(premier, page_size)
+    else:
+        nombre = len(mails)
+        page = table.take(pa.array(mails[premier:premier + page_size]))
+    return page.to_pylist(), nombre
+
+
+# Les pages du site : chacune est construite à sa première visite
+PAGES = {
+    "/formatage": page_formatage,
+    "/mapReduce": page_map_reduce,
+    "/extractThematiques": page_thematiques,
+    "/patternsFrequents": page_patterns,
+    "/acp": page_acp,
+    "/ameliorationCorrection": page_amelioration,
+    "/recherche": page_recherche,
+}
+
 
 # Permet de mettre à jour la page selon le lien
 @app.callback(Output("page-content", "children"), [Input("url", "pathname")])
@@ -525,35 +654,10 @@ def render_page_content(pathname):
             presentation,
             logos
         ])
-    elif pathname == "/formatage":
-        return html.Div(children=[
-            header,
-            formatage_page
-        ])
-    elif pathname == "/mapReduce":
-        return html.Div(children=[
-            header,
-            map_reduce_page
-        ])
-    elif pathname == "/extractThematiques":
-        return html.Div(children=[
-            header,
-            extract_thematiques_page
-        ])
-    elif pathname == "/patternsFrequents":
-        return html.Div(children=[
-            header,
-            patternsFrequents
-        ])
-    elif pathname == "/acp":
-        return html.Div(children=[
-            header,
-            acp_layout
-        ])
-    elif pathname == "/ameliorationCorrection":
+    elif pathname in PAGES:
         return html.Div(children=[
             header,
-            amelioration_page
+            PAGES[pathname]()
         ])
     # Si l'utilisateur veut rejoindre une page non existante
     return dbc.Jumbotron(